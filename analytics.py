@@ -13,11 +13,30 @@ Features:
 import os
 import sqlite3
 import re
+import heapq
+import threading
+import time
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, FrozenSet, Tuple
+from array import array
 from collections import Counter, defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from database.create_fts5_tables import WORDS_FTS_TOKENIZE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Optional: Numba-compiled kernels for the hot loops (pure Python fallback otherwise).
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = np is not None
+except ImportError:
+    njit = None
+    NUMBA_AVAILABLE = False
 
 
 DB_PATH = 'conversations.db'
@@ -89,14 +108,341 @@ def load_boring_words() -> Set[str]:
     return set(STOPWORDS) | set(BORING_CONTRACTIONS)
 
 
-def extract_words(text: str) -> List[str]:
-    """Extract words from text, lowercased."""
+# Open connections, keyed by (thread id, db path). See _connect().
+_CONNECTIONS: Dict[Tuple[int, str], sqlite3.Connection] = {}
+_CONNECTIONS_LOCK = threading.Lock()
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """
+    Return this thread's connection to `db_path`, opening it on first use.
+
+    Connections stay open between calls so SQLite's page cache stays warm for
+    repeated dashboard requests. There is one per thread, so transactions from
+    concurrent callers never interleave. Callers must not close it.
+    """
+    key = (threading.get_ident(), os.path.abspath(db_path))
+    with _CONNECTIONS_LOCK:
+        conn = _CONNECTIONS.get(key)
+    
+    if conn is not None:
+        # Discard anything a previous call left half-done (e.g. it raised mid-write).
+        if conn.in_transaction:
+            conn.rollback()
+        return conn
+    
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    conn.execute("PRAGMA mmap_size=1073741824")  # read pages straight from mmap (up to 1 GiB)
+    conn.execute("PRAGMA temp_store=MEMORY")
+    with _CONNECTIONS_LOCK:
+        _CONNECTIONS[key] = conn
+    return conn
+
+
+def close_connections(db_path: Optional[str] = None) -> None:
+    """Close pooled connections (all of them, or only those for `db_path`)."""
+    target = os.path.abspath(db_path) if db_path else None
+    with _CONNECTIONS_LOCK:
+        keys = [k for k in _CONNECTIONS if target is None or k[1] == target]
+        conns = [_CONNECTIONS.pop(k) for k in keys]
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def _ensure_build_state_table(conn: sqlite3.Connection) -> None:
+    # One row per materialized aggregate: the `messages` signature it was built from.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_build_state (
+            name TEXT PRIMARY KEY,
+            signature TEXT NOT NULL,
+            built_at REAL NOT NULL
+        )
+    ''')
+
+
+def _ensure_change_counter(conn: sqlite3.Connection) -> None:
+    # Triggers bump `analytics_changes.counter` on every insert/update/delete in
+    # `messages`; a no-op lookup once they exist.
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'messages_changes_ad'"
+    ).fetchone():
+        return
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_changes (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            counter INTEGER NOT NULL
+        )
+    ''')
+    # Bump on (re)install too: writes made while the triggers were missing (a
+    # new database, or `messages` recreated) were not counted.
+    conn.execute('''
+        INSERT INTO analytics_changes(id, counter) VALUES (1, 1)
+        ON CONFLICT(id) DO UPDATE SET counter = counter + 1
+    ''')
+    for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS messages_changes_{suffix} AFTER {event} ON messages
+            BEGIN
+                UPDATE analytics_changes SET counter = counter + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def _messages_signature(conn: sqlite3.Connection) -> str:
+    """
+    Change marker for `messages`: a counter bumped by triggers on every
+    insert, update and delete, so edits are seen too. A single-row read.
+    """
+    _ensure_change_counter(conn)
+    row = conn.execute("SELECT counter FROM analytics_changes WHERE id = 1").fetchone()
+    return str(row[0])
+
+
+def _is_fresh(conn: sqlite3.Connection, name: str, signature: str) -> bool:
+    _ensure_build_state_table(conn)
+    row = conn.execute(
+        "SELECT signature FROM analytics_build_state WHERE name = ?", (name,)
+    ).fetchone()
+    return row is not None and row[0] == signature
+
+
+def _mark_built(conn: sqlite3.Connection, name: str, signature: str) -> None:
+    _ensure_build_state_table(conn)
+    conn.execute(
+        '''
+        INSERT INTO analytics_build_state(name, signature, built_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            signature=excluded.signature,
+            built_at=excluded.built_at
+        ''',
+        (name, signature, time.time()),
+    )
+
+
+def _jit(fn):
+    """Compile `fn` with Numba when available; otherwise keep the Python function."""
+    return njit(cache=True)(fn) if NUMBA_AVAILABLE else fn
+
+
+@_jit
+def _ascii_word_spans(buf, starts, ends, min_length=1):
+    """
+    Tokenize lowercased ASCII bytes exactly like `_WORD_RE`.
+
+    Writes (start, end) offsets of tokens at least `min_length` bytes long into
+    `starts`/`ends` and returns the token count. Shorter tokens are skipped
+    here so the caller never builds a str for them.
+    """
+    n = len(buf)
+    count = 0
+    i = 0
+    while i < n:
+        c = buf[i]
+        prev_is_word = i > 0 and (
+            (97 <= buf[i - 1] <= 122) or (48 <= buf[i - 1] <= 57)
+            or (65 <= buf[i - 1] <= 90) or buf[i - 1] == 95
+        )
+        if not (97 <= c <= 122) or prev_is_word:
+            i += 1
+            continue
+
+        j = i
+        while j < n and 97 <= buf[j] <= 122:
+            j += 1
+        if j < n and ((48 <= buf[j] <= 57) or (65 <= buf[j] <= 90) or buf[j] == 95):
+            # Run ends inside a word (e.g. "abc1"): no boundary, no token.
+            i = j
+            continue
+
+        end = j
+        if j + 1 < n and buf[j] == 39 and 97 <= buf[j + 1] <= 122:
+            k = j + 1
+            while k < n and 97 <= buf[k] <= 122:
+                k += 1
+            if k >= n or not ((48 <= buf[k] <= 57) or (65 <= buf[k] <= 90) or buf[k] == 95):
+                end = k
+
+        if end - i >= min_length:
+            starts[count] = i
+            ends[count] = end
+            count += 1
+        i = end
+    return count
+
+
+# Keep contractions as a single token (e.g., "don't" instead of "don" + "t")
+_WORD_RE = re.compile(r"\b[a-z]+(?:'[a-z]+)?\b")
+_STOPWORDS_FROZEN = frozenset(STOPWORDS)
+
+# vocabulary_size_trend(): word hashes are 64-bit; compact a period's array at this size.
+_HASH_MASK = 0xFFFFFFFFFFFFFFFF
+_VOCAB_COMPACT_AT = 1 << 20
+
+# SQL expressions for period keys (local time, like datetime.fromtimestamp()).
+_PERIOD_EXPRESSIONS = {
+    'day': "DATE(create_time, 'unixepoch', 'localtime')",
+    # Monday of the week: jump to the coming Sunday, then back six days.
+    'week': "DATE(create_time, 'unixepoch', 'localtime', 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m', create_time, 'unixepoch', 'localtime')",
+}
+
+# The same keys, derived from a `daily_conversation_stats.day` value.
+_DAILY_PERIOD_EXPRESSIONS = {
+    'day': "day",
+    'week': "DATE(day, 'weekday 0', '-6 days')",
+    'month': "substr(day, 1, 7)",
+}
+
+
+def _normalize_text(text: str) -> str:
+    """Lowercase `text` and map “smart quote” apostrophes to ASCII."""
     t = (text or "").lower()
     # Normalize “smart quotes” apostrophes to ASCII apostrophe so contractions are kept intact.
-    t = t.replace("’", "'").replace("‘", "'")
-    # Keep contractions as a single token (e.g., "don't" instead of "don" + "t")
-    words = re.findall(r"\b[a-z]+(?:'[a-z]+)?\b", t)
-    return [w for w in words if len(w) > 2]  # Filter very short words
+    return t.replace("’", "'").replace("‘", "'")
+
+
+def _use_kernel(t: str) -> bool:
+    return NUMBA_AVAILABLE and t.isascii()
+
+
+def _kernel_tokens(t: str, min_length: int) -> List[str]:
+    buf = np.frombuffer(t.encode("ascii"), dtype=np.uint8)
+    starts = np.empty(len(buf) // 2 + 1, dtype=np.int64)
+    ends = np.empty(len(buf) // 2 + 1, dtype=np.int64)
+    count = _ascii_word_spans(buf, starts, ends, min_length)
+    return [t[s:e] for s, e in zip(starts[:count].tolist(), ends[:count].tolist())]
+
+
+def _tokenize(text: str, min_length: int = 1) -> List[str]:
+    """Lowercase `text` and split it into word tokens of at least `min_length` characters."""
+    t = _normalize_text(text)
+    if _use_kernel(t):
+        return _kernel_tokens(t, min_length)
+    if min_length > 1:
+        return [w for w in _WORD_RE.findall(t) if len(w) >= min_length]
+    return _WORD_RE.findall(t)
+
+
+def extract_words(text: str) -> List[str]:
+    """Extract words from text, lowercased."""
+    return _tokenize(text, min_length=3)  # Filter very short words
+
+
+def _trie_pattern(words: FrozenSet[str]) -> str:
+    """Regex alternation matching exactly `words`, factored by shared prefixes."""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def emit(node: Dict) -> str:
+        alternatives = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ''
+        body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return emit(trie)
+
+
+@lru_cache(maxsize=8)
+def _content_word_re(stopwords: FrozenSet[str]) -> "re.Pattern[str]":
+    """
+    `_WORD_RE` with a single capture group that is empty for tokens in `stopwords`.
+
+    Stopwords are matched (and consumed) only where they are the whole token:
+    not followed by a word character, and for plain words not followed by the
+    apostrophe suffix `_WORD_RE` would have absorbed.
+    """
+    plain = frozenset(w for w in stopwords if "'" not in w)
+    contractions = stopwords - plain
+    stops = []
+    if plain:
+        stops.append("(?:" + _trie_pattern(plain) + r")\b(?!'[a-z]+\b)")
+    if contractions:
+        stops.append("(?:" + _trie_pattern(contractions) + r")\b")
+    word = r"\b([a-z]+(?:'[a-z]+)?)\b"
+    if not stops:
+        return re.compile(word)
+    return re.compile(r"\b(?:" + "|".join(stops) + ")|" + word)
+
+
+def _content_words(text: str, stopwords: FrozenSet[str], min_length: int = 3) -> List[str]:
+    """`extract_words()` plus stopword/length filtering, in a single pass."""
+    min_length = max(min_length, 3)
+    t = _normalize_text(text)
+    if _use_kernel(t):
+        return [w for w in _kernel_tokens(t, min_length) if w not in stopwords]
+    # Stopwords come back as "" from the regex, so the length check drops them too.
+    return [w for w in _content_word_re(stopwords).findall(t) if len(w) >= min_length]
+
+
+def _register_word_count(conn: sqlite3.Connection) -> None:
+    # Same word count as before (`str.split()`), evaluated inside SQL aggregates.
+    conn.create_function(
+        "word_count", 1, lambda text: len(text.split()) if text else 0, deterministic=True
+    )
+
+
+def _local_tz_key() -> str:
+    """Identify the local time zone (daily buckets are in local time)."""
+    return f"{time.timezone}/{time.altzone}/{'/'.join(time.tzname)}"
+
+
+def rebuild_daily_stats(conn: sqlite3.Connection) -> None:
+    """
+    Recompute `daily_conversation_stats`: message/word counts per local day
+    and conversation, so usage_over_time() reads O(days) rows, not O(messages).
+    """
+    _register_word_count(conn)
+    signature = f"{_messages_signature(conn)}|{_local_tz_key()}"
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_conversation_stats (
+            day TEXT NOT NULL,
+            conversation_id TEXT NOT NULL,
+            message_count INTEGER NOT NULL,
+            word_count INTEGER NOT NULL,
+            PRIMARY KEY (day, conversation_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("DELETE FROM daily_conversation_stats")
+    conn.execute(f'''
+        INSERT INTO daily_conversation_stats(day, conversation_id, message_count, word_count)
+        SELECT {_PERIOD_EXPRESSIONS['day']} AS day, conversation_id, COUNT(*), SUM(word_count(content))
+        FROM messages
+        WHERE create_time IS NOT NULL
+        GROUP BY day, conversation_id
+        HAVING day IS NOT NULL
+    ''')
+    _mark_built(conn, "daily_conversation_stats", signature)
+
+
+def _usage_from_daily_stats(conn: sqlite3.Connection, period: str) -> List[Dict]:
+    signature = f"{_messages_signature(conn)}|{_local_tz_key()}"
+    if not _is_fresh(conn, "daily_conversation_stats", signature):
+        rebuild_daily_stats(conn)
+        conn.commit()
+    
+    period_expr = _DAILY_PERIOD_EXPRESSIONS.get(period, _DAILY_PERIOD_EXPRESSIONS['day'])
+    cursor = conn.execute(f'''
+        SELECT
+            {period_expr} AS period,
+            SUM(message_count) AS message_count,
+            COUNT(DISTINCT conversation_id) AS conversation_count,
+            SUM(word_count) AS word_count
+        FROM daily_conversation_stats
+        GROUP BY period
+        ORDER BY period
+    ''')
+    return [dict(row) for row in cursor]
 
 
 def usage_over_time(
@@ -116,12 +462,24 @@ def usage_over_time(
     Returns:
         List of dicts with period, message_count, conversation_count, word_count
     """
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    conn = _connect(db_path)
+    _register_word_count(conn)
     
-    # Get all messages with timestamps and content
-    query = '''
-        SELECT create_time, conversation_id, content
+    # Unbounded queries roll up the pre-aggregated daily table.
+    if not start_date and not end_date:
+        try:
+            return _usage_from_daily_stats(conn, period)
+        except sqlite3.OperationalError:
+            conn.rollback()
+    
+    # Period keys in local time, matching datetime.fromtimestamp().
+    period_expr = _PERIOD_EXPRESSIONS.get(period, _PERIOD_EXPRESSIONS['day'])
+    query = f'''
+        SELECT
+            {period_expr} AS period,
+            COUNT(*) AS message_count,
+            COUNT(DISTINCT conversation_id) AS conversation_count,
+            SUM(word_count(content)) AS word_count
         FROM messages
         WHERE create_time IS NOT NULL
     '''
@@ -135,100 +493,46 @@ def usage_over_time(
         query += ' AND create_time <= ?'
         params.append(end_date.timestamp())
     
-    query += ' ORDER BY create_time'
-    
-    cursor = conn.execute(query, params)
-    messages = cursor.fetchall()
+    query += ' GROUP BY period HAVING period IS NOT NULL ORDER BY period'
     
-    # Group by period
-    period_counts = defaultdict(lambda: {'messages': 0, 'conversations': set(), 'word_count': 0})
-    
-    for row in messages:
-        try:
-            dt = datetime.fromtimestamp(row['create_time'])
-            conv_id = row['conversation_id']
-            content = row['content'] or ''
-            
-            # Calculate word count from message content
-            word_count = len(content.split())
-            
-            if period == 'day':
-                key = dt.date().isoformat()
-            elif period == 'week':
-                # Get Monday of the week
-                monday = dt - timedelta(days=dt.weekday())
-                key = monday.date().isoformat()
-            elif period == 'month':
-                key = dt.strftime('%Y-%m')
-            else:
-                key = dt.date().isoformat()
-            
-            period_counts[key]['messages'] += 1
-            period_counts[key]['conversations'].add(conv_id)
-            period_counts[key]['word_count'] += word_count
-        except (ValueError, OSError):
-            continue
-    
-    # Convert to list
-    results = []
-    for key in sorted(period_counts.keys()):
-        results.append({
-            'period': key,
-            'message_count': period_counts[key]['messages'],
-            'conversation_count': len(period_counts[key]['conversations']),
-            'word_count': period_counts[key]['word_count']
-        })
-    
-    conn.close()
-    return results
+    return [dict(row) for row in conn.execute(query, params)]
 
 
 def longest_streak(db_path: str = DB_PATH) -> Dict:
     """Calculate longest streak of consecutive days with chats."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.execute('''
-        SELECT DISTINCT DATE(datetime(create_time, 'unixepoch')) as chat_date
-        FROM messages
-        WHERE create_time IS NOT NULL
-        ORDER BY chat_date
-    ''')
-    
-    dates = [datetime.strptime(row[0], '%Y-%m-%d').date() for row in cursor.fetchall()]
-    conn.close()
-    
-    if not dates:
+    conn = _connect(db_path)
+    # Gaps-and-islands: consecutive days share the same (julianday - row_number).
+    row = conn.execute('''
+        WITH days AS (
+            SELECT DISTINCT DATE(create_time, 'unixepoch') AS chat_date
+            FROM messages
+            WHERE create_time IS NOT NULL
+        ),
+        islands AS (
+            SELECT chat_date, julianday(chat_date) - ROW_NUMBER() OVER (ORDER BY chat_date) AS grp
+            FROM days
+            WHERE chat_date IS NOT NULL
+        )
+        SELECT COUNT(*) AS streak, MIN(chat_date) AS start_date, MAX(chat_date) AS end_date
+        FROM islands
+        GROUP BY grp
+        ORDER BY streak DESC, start_date
+        LIMIT 1
+    ''').fetchone()
+    
+    if not row:
         return {'longest_streak': 0, 'start_date': None, 'end_date': None}
     
-    # Find longest streak
-    longest = 1
-    current = 1
-    streak_start = dates[0]
-    best_start = dates[0]
-    best_end = dates[0]
-    
-    for i in range(1, len(dates)):
-        days_diff = (dates[i] - dates[i-1]).days
-        if days_diff == 1:
-            current += 1
-            if current > longest:
-                longest = current
-                best_start = streak_start
-                best_end = dates[i]
-        else:
-            current = 1
-            streak_start = dates[i]
-    
     return {
-        'longest_streak': longest,
-        'start_date': best_start.isoformat(),
-        'end_date': best_end.isoformat()
+        'longest_streak': row[0],
+        'start_date': row[1],
+        'end_date': row[2]
     }
 
 
 def top_conversations_by_volume(db_path: str = DB_PATH, limit: int = 10) -> List[Dict]:
     """Get top conversations by message/word count."""
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    conn = _connect(db_path)
     
     cursor = conn.execute('''
         SELECT 
@@ -243,41 +547,79 @@ def top_conversations_by_volume(db_path: str = DB_PATH, limit: int = 10) -> List
         LIMIT ?
     ''', (limit,))
     
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+    return [dict(row) for row in cursor.fetchall()]
 
 
-def top_words(db_path: str = DB_PATH, limit: int = 50, min_length: int = 3) -> List[Dict]:
-    """Get top words across all conversations (stopword filtered)."""
-    conn = sqlite3.connect(db_path)
+def _top_words_fts5(conn: sqlite3.Connection, limit: int, min_length: int) -> Optional[List[Dict]]:
+    """
+    Count top words from the `messages_words_fts` index via `fts5vocab`.
+
+    SQLite already tokenized every message when it was indexed, so this reads
+    the vocabulary (one row per distinct term) instead of every message. Terms
+    are split on separators only; `extract_words()` is run over each term, so
+    the counts are the same as the scan's. Returns None when the index is
+    missing or was built with another tokenizer.
+    """
+    try:
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='messages_words_fts'"
+        ).fetchone()
+        if not row or f'tokenize="{WORDS_FTS_TOKENIZE}"' not in row[0]:
+            return None
+
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS temp.messages_words_fts_vocab "
+            "USING fts5vocab(main, messages_words_fts, row)"
+        )
+        cursor = conn.execute(
+            """
+            SELECT term, cnt FROM temp.messages_words_fts_vocab
+            WHERE LENGTH(term) >= ? AND term GLOB '*[a-z]*'
+            """,
+            (max(min_length, 3),),
+        )
+        word_counts = Counter()
+        boring = frozenset(load_boring_words())
+        for term, count in cursor:
+            for word in _content_words(term, boring, min_length):
+                word_counts[word] += count
+    except sqlite3.OperationalError:
+        return None
+
+    return [{'word': word, 'count': count} for word, count in _top_k(word_counts, limit)]
+
+
+def _top_words_scan(conn: sqlite3.Connection, limit: int, min_length: int) -> List[Dict]:
+    """Tokenize every message in Python (fallback when FTS5 isn't set up)."""
     cursor = conn.execute('''
         SELECT content FROM messages
         WHERE content IS NOT NULL
     ''')
     
     word_counts = Counter()
-    boring = load_boring_words()
-    
-    for row in cursor.fetchall():
-        words = extract_words(row[0])
-        # Filter stopwords and short words
-        words = [w for w in words if w not in boring and len(w) >= min_length]
-        word_counts.update(words)
+    boring = frozenset(load_boring_words())
     
-    conn.close()
-    
-    # Return top N
-    results = []
-    for word, count in word_counts.most_common(limit):
-        results.append({'word': word, 'count': count})
+    for row in cursor:
+        word_counts.update(_content_words(row[0], boring, min_length))
     
+    return [{'word': word, 'count': count} for word, count in _top_k(word_counts, limit)]
+
+
+def top_words(db_path: str = DB_PATH, limit: int = 50, min_length: int = 3) -> List[Dict]:
+    """
+    Get top words across all conversations (stopword filtered).
+
+    Uses the FTS5 vocabulary when available; otherwise scans messages in Python.
+    """
+    conn = _connect(db_path)
+    results = _top_words_fts5(conn, limit, min_length)
+    if results is None:
+        results = _top_words_scan(conn, limit, min_length)
     return results
 
 
-def top_phrases(db_path: str = DB_PATH, limit: int = 30, phrase_length: int = 2) -> List[Dict]:
-    """Get top phrases (n-grams) across conversations."""
-    conn = sqlite3.connect(db_path)
+def _count_phrases(conn: sqlite3.Connection, phrase_length: int) -> Counter:
+    """Count stopword-filtered n-grams across all messages."""
     cursor = conn.execute('''
         SELECT content FROM messages
         WHERE content IS NOT NULL
@@ -285,9 +627,8 @@ def top_phrases(db_path: str = DB_PATH, limit: int = 30, phrase_length: int = 2)
     
     phrase_counts = Counter()
     
-    for row in cursor.fetchall():
-        words = extract_words(row[0])
-        words = [w for w in words if w not in STOPWORDS and len(w) >= 3]
+    for row in cursor:
+        words = _content_words(row[0], _STOPWORDS_FROZEN)
         
         # Generate n-grams
         for i in range(len(words) - phrase_length + 1):
@@ -295,61 +636,134 @@ def top_phrases(db_path: str = DB_PATH, limit: int = 30, phrase_length: int = 2)
             if len(phrase) > phrase_length * 2:  # Filter very short phrases
                 phrase_counts[phrase] += 1
     
-    conn.close()
-    
-    results = []
-    for phrase, count in phrase_counts.most_common(limit):
-        results.append({'phrase': phrase, 'count': count})
+    return phrase_counts
+
+
+def _top_k(counts: Dict[str, int], limit: int) -> List[Tuple[str, int]]:
+    """
+    The `limit` highest counts, ties broken alphabetically (like the SQL paths).
+
+    A bounded heap over the items: O(n log limit) rather than sorting them all.
+    """
+    return heapq.nsmallest(limit, counts.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+def _ensure_ngram_tables(conn: sqlite3.Connection) -> None:
+    # Cheap on reads: one sqlite_master lookup once the table and index exist.
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_word_ngrams_rank'"
+    ).fetchone():
+        return
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS word_ngrams (
+            phrase_length INTEGER NOT NULL,
+            phrase TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (phrase_length, phrase)
+        )
+    ''')
+    # One-time migration: replace the old count index with a covering index in
+    # `top_phrases()` order, so top-K reads stop after `limit` rows.
+    conn.execute("DROP INDEX IF EXISTS idx_word_ngrams_count")
+    conn.execute(
+        "CREATE INDEX idx_word_ngrams_rank "
+        "ON word_ngrams(phrase_length, count DESC, phrase)"
+    )
+
+
+def rebuild_phrase_counts(conn: sqlite3.Connection, phrase_length: int = 2) -> None:
+    """Recompute the materialized `word_ngrams` rows for one phrase length."""
+    _ensure_ngram_tables(conn)
+    signature = _messages_signature(conn)
+    counts = _count_phrases(conn, phrase_length)
     
-    return results
+    conn.execute("DELETE FROM word_ngrams WHERE phrase_length = ?", (phrase_length,))
+    conn.executemany(
+        "INSERT INTO word_ngrams(phrase_length, phrase, count) VALUES (?, ?, ?)",
+        ((phrase_length, phrase, count) for phrase, count in counts.items()),
+    )
+    _mark_built(conn, f"word_ngrams:{phrase_length}", signature)
+
+
+def top_phrases(db_path: str = DB_PATH, limit: int = 30, phrase_length: int = 2) -> List[Dict]:
+    """
+    Get top phrases (n-grams) across conversations.
+
+    Counts are materialized in `word_ngrams` and only rebuilt when `messages`
+    changed (see `_messages_signature`) since the last build.
+    """
+    conn = _connect(db_path)
+    try:
+        _ensure_ngram_tables(conn)
+        if not _is_fresh(conn, f"word_ngrams:{phrase_length}", _messages_signature(conn)):
+            rebuild_phrase_counts(conn, phrase_length)
+            conn.commit()
+        cursor = conn.execute(
+            '''
+            SELECT phrase, count FROM word_ngrams
+            WHERE phrase_length = ?
+            ORDER BY count DESC, phrase
+            LIMIT ?
+            ''',
+            (phrase_length, limit),
+        )
+        rows = cursor.fetchall()
+    except sqlite3.OperationalError:
+        # Read-only / locked database: count in memory without materializing.
+        conn.rollback()
+        rows = _top_k(_count_phrases(conn, phrase_length), limit)
+    
+    return [{'phrase': phrase, 'count': count} for phrase, count in rows]
+
+
+def _unique_hashes(hashes: array) -> array:
+    """De-duplicate an array of uint64 word hashes (NumPy sort-unique)."""
+    return array('Q', np.unique(np.frombuffer(hashes, dtype=np.uint64)).tobytes())
 
 
 def vocabulary_size_trend(db_path: str = DB_PATH, period: str = 'month') -> List[Dict]:
-    """Track vocabulary size (unique words) over time."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.execute('''
-        SELECT content, create_time
+    """
+    Track vocabulary size (unique words) over time.
+
+    With NumPy, each period keeps 64-bit word hashes in a flat array that is
+    de-duplicated with `np.unique` as it grows: 8 bytes per distinct word
+    instead of a str object in a set.
+    """
+    conn = _connect(db_path)
+    period_expr = _PERIOD_EXPRESSIONS.get(period, _PERIOD_EXPRESSIONS['day'])
+    cursor = conn.execute(f'''
+        SELECT {period_expr} AS period, content
         FROM messages
         WHERE content IS NOT NULL AND create_time IS NOT NULL
-        ORDER BY create_time
     ''')
     
-    # Group by period and track unique words
-    period_vocab = defaultdict(set)
-    
-    for row in cursor.fetchall():
-        try:
-            dt = datetime.fromtimestamp(row[1])
-            
-            if period == 'month':
-                key = dt.strftime('%Y-%m')
-            elif period == 'week':
-                monday = dt - timedelta(days=dt.weekday())
-                key = monday.date().isoformat()
-            else:
-                key = dt.date().isoformat()
-            
-            words = extract_words(row[0])
-            words = [w for w in words if w not in STOPWORDS and len(w) >= 3]
-            period_vocab[key].update(words)
-        except (ValueError, OSError):
-            continue
-    
-    conn.close()
-    
-    results = []
-    for key in sorted(period_vocab.keys()):
-        results.append({
-            'period': key,
-            'unique_words': len(period_vocab[key])
-        })
+    if np is None:
+        # Group by period and track unique words
+        period_vocab = defaultdict(set)
+        for key, content in cursor:
+            if key is not None:
+                period_vocab[key].update(_content_words(content, _STOPWORDS_FROZEN))
+        sizes = {key: len(words) for key, words in period_vocab.items()}
+    else:
+        period_hashes = defaultdict(lambda: array('Q'))
+        compact_at = {}
+        for key, content in cursor:
+            if key is None:
+                continue
+            hashes = period_hashes[key]
+            hashes.extend(hash(w) & _HASH_MASK for w in _content_words(content, _STOPWORDS_FROZEN))
+            if len(hashes) >= compact_at.get(key, _VOCAB_COMPACT_AT):
+                hashes = period_hashes[key] = _unique_hashes(hashes)
+                # Grow the threshold with the vocabulary so compaction stays amortized O(1).
+                compact_at[key] = max(_VOCAB_COMPACT_AT, 2 * len(hashes))
+        sizes = {key: len(_unique_hashes(hashes)) for key, hashes in period_hashes.items()}
     
-    return results
+    return [{'period': key, 'unique_words': sizes[key]} for key in sorted(sizes)]
 
 
 def response_ratio(db_path: str = DB_PATH) -> Dict:
     """Calculate user vs assistant message/word ratio."""
-    conn = sqlite3.connect(db_path)
+    conn = _connect(db_path)
     cursor = conn.execute('''
         SELECT 
             SUM(CASE WHEN role = 'user' THEN 1 ELSE 0 END) as user_messages,
@@ -361,7 +775,6 @@ def response_ratio(db_path: str = DB_PATH) -> Dict:
     ''')
     
     row = cursor.fetchone()
-    conn.close()
     
     user_msgs = row[0] or 0
     assistant_msgs = row[1] or 0
@@ -385,29 +798,20 @@ def response_ratio(db_path: str = DB_PATH) -> Dict:
 
 def time_of_day_heatmap(db_path: str = DB_PATH) -> List[Dict]:
     """Count messages by hour of day."""
-    conn = sqlite3.connect(db_path)
+    conn = _connect(db_path)
     cursor = conn.execute('''
-        SELECT create_time
+        SELECT CAST(strftime('%H', create_time, 'unixepoch', 'localtime') AS INTEGER) AS hour, COUNT(*)
         FROM messages
         WHERE create_time IS NOT NULL
+        GROUP BY hour
     ''')
-    
-    hour_counts = Counter()
-    
-    for row in cursor.fetchall():
-        try:
-            dt = datetime.fromtimestamp(row[0])
-            hour_counts[dt.hour] += 1
-        except (ValueError, OSError):
-            continue
-    
-    conn.close()
+    hour_counts = {hour: count for hour, count in cursor if hour is not None}
     
     results = []
     for hour in range(24):
         results.append({
             'hour': hour,
-            'count': hour_counts[hour],
+            'count': hour_counts.get(hour, 0),
             'hour_label': f"{hour:02d}:00"
         })
     
@@ -1,22 +1,26 @@
 """
 Conversation API routes.
 """
-from fastapi import APIRouter, Query, Path as PathParam, HTTPException
+from fastapi import APIRouter, Query, Path as PathParam, HTTPException, Response
+from pydantic import TypeAdapter
 from typing import List, Optional
 import sys
+import json
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from api.models import ConversationSummary, ConversationDetail
-from backend.db import get_db_connection, check_database_initialized
+from backend.db import get_db_connection, check_database_initialized, ensure_conversation_summary
 import sqlite3
 
 router = APIRouter(prefix="/api/conversations", tags=["conversations"])
 
 from backend.db import get_db_connection as get_db
 
+_SUMMARY_LIST = TypeAdapter(List[ConversationSummary])
+
 
 @router.get("/", response_model=List[ConversationSummary])
 async def list_conversations(
@@ -39,23 +43,42 @@ async def list_conversations(
     conn = get_db()
     conn.row_factory = sqlite3.Row
     
-    # Build query
-    query = """
-        SELECT 
-            c.conversation_id,
-            c.title,
-            c.create_time,
-            c.update_time,
-            c.ai_source,
-            c.is_starred,
-            COALESCE(s.message_count_total, 0) as message_count,
-            COALESCE(s.word_count_total, 0) as word_count,
-            ct.custom_title
-        FROM conversations c
-        LEFT JOIN conversation_stats s ON s.conversation_id = c.conversation_id
-        LEFT JOIN custom_titles ct ON ct.conversation_id = c.conversation_id
-        WHERE 1=1
-    """
+    # Build query: read the trigger-maintained summary table when available,
+    # otherwise join the source tables.
+    if ensure_conversation_summary(conn):
+        query = """
+            SELECT 
+                c.conversation_id,
+                c.title,
+                c.create_time,
+                c.update_time,
+                c.ai_source,
+                c.is_starred,
+                c.message_count,
+                c.word_count,
+                c.custom_title,
+                c.tags_json
+            FROM conversation_summary c
+            WHERE 1=1
+        """
+    else:
+        query = """
+            SELECT 
+                c.conversation_id,
+                c.title,
+                c.create_time,
+                c.update_time,
+                c.ai_source,
+                c.is_starred,
+                COALESCE(s.message_count_total, 0) as message_count,
+                COALESCE(s.word_count_total, 0) as word_count,
+                ct.custom_title,
+                NULL as tags_json
+            FROM conversations c
+            LEFT JOIN conversation_stats s ON s.conversation_id = c.conversation_id
+            LEFT JOIN custom_titles ct ON ct.conversation_id = c.conversation_id
+            WHERE 1=1
+        """
     params = []
     
     # Apply filters
@@ -84,11 +107,11 @@ async def list_conversations(
     elif sort == "oldest":
         query += " ORDER BY c.create_time ASC NULLS LAST"
     elif sort == "longest":
-        query += " ORDER BY s.word_count_total DESC NULLS LAST"
+        query += " ORDER BY word_count DESC"
     elif sort == "most_messages":
-        query += " ORDER BY s.message_count_total DESC NULLS LAST"
+        query += " ORDER BY message_count DESC"
     elif sort == "most_words":
-        query += " ORDER BY s.word_count_total DESC NULLS LAST"
+        query += " ORDER BY word_count DESC"
     else:
         query += " ORDER BY c.create_time DESC NULLS LAST"
     
@@ -98,21 +121,28 @@ async def list_conversations(
     cursor = conn.execute(query, params)
     rows = cursor.fetchall()
     
-    # Get tags for each conversation
+    # Tags come with the summary rows; otherwise get them for the whole page in one query
+    tags_by_conv = {}
+    if rows and rows[0]['tags_json'] is not None:
+        tags_by_conv = {row['conversation_id']: json.loads(row['tags_json']) for row in rows}
+    elif rows:
+        page_ids = [row['conversation_id'] for row in rows]
+        tag_cursor = conn.execute(f"""
+            SELECT ct.conversation_id, json_group_array(t.name) as tags_json
+            FROM conversation_tags ct
+            JOIN tags t ON t.tag_id = ct.tag_id
+            WHERE ct.conversation_id IN ({','.join('?' * len(page_ids))})
+            GROUP BY ct.conversation_id
+        """, page_ids)
+        tags_by_conv = {r['conversation_id']: json.loads(r['tags_json']) for r in tag_cursor}
+    
     results = []
     for row in rows:
         conv_id = row['conversation_id']
+        tags = tags_by_conv.get(conv_id, [])
         
-        # Get tags
-        tag_cursor = conn.execute("""
-            SELECT t.name
-            FROM tags t
-            JOIN conversation_tags ct ON ct.tag_id = t.tag_id
-            WHERE ct.conversation_id = ?
-        """, (conv_id,))
-        tags = [r[0] for r in tag_cursor.fetchall()]
-        
-        results.append(ConversationSummary(
+        # Columns already have the model's types: skip per-field validation.
+        results.append(ConversationSummary.model_construct(
             conversation_id=conv_id,
             title=row['title'],
             create_time=row['create_time'],
@@ -126,7 +156,9 @@ async def list_conversations(
         ))
     
     conn.close()
-    return results
+    # Serialize in pydantic-core directly; returning a Response also skips
+    # FastAPI's response_model re-validation (the model still documents it).
+    return Response(_SUMMARY_LIST.dump_json(results), media_type="application/json")
 
 
 @router.get("/{conversation_id}", response_model=ConversationDetail)
@@ -143,7 +175,13 @@ async def get_conversation(conversation_id: str = PathParam(..., description="Co
             c.update_time,
             c.ai_source,
             c.is_starred,
-            ct.custom_title
+            ct.custom_title,
+            (
+                SELECT json_group_array(t.name)
+                FROM tags t
+                JOIN conversation_tags xt ON xt.tag_id = t.tag_id
+                WHERE xt.conversation_id = c.conversation_id
+            ) as tags_json
         FROM conversations c
         LEFT JOIN custom_titles ct ON ct.conversation_id = c.conversation_id
         WHERE c.conversation_id = ?
@@ -154,14 +192,7 @@ async def get_conversation(conversation_id: str = PathParam(..., description="Co
         conn.close()
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    # Get tags
-    tag_cursor = conn.execute("""
-        SELECT t.name
-        FROM tags t
-        JOIN conversation_tags ct ON ct.tag_id = t.tag_id
-        WHERE ct.conversation_id = ?
-    """, (conversation_id,))
-    tags = [r[0] for r in tag_cursor.fetchall()]
+    tags = json.loads(row['tags_json'])
     
     # Get stats
     stats_cursor = conn.execute("""
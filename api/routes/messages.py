@@ -1,7 +1,8 @@
 """
 Message API routes.
 """
-from fastapi import APIRouter, Path as PathParam, Query, HTTPException
+from fastapi import APIRouter, Path as PathParam, Query, HTTPException, Response
+from pydantic import TypeAdapter
 from typing import List, Optional
 import sys
 import sqlite3
@@ -15,6 +16,8 @@ from backend.db import get_db_connection as get_db
 
 router = APIRouter(prefix="/api/conversations", tags=["messages"])
 
+_MESSAGE_LIST = TypeAdapter(List[Message])
+
 
 @router.get("/{conversation_id}/messages", response_model=List[Message])
 async def get_messages(
@@ -78,8 +81,10 @@ async def get_messages(
     rows = cursor.fetchall()
     conn.close()
     
-    return [
-        Message(
+    # Columns already have the model's types: build without validation and
+    # serialize in pydantic-core, skipping FastAPI's response_model pass.
+    messages = [
+        Message.model_construct(
             message_id=row['message_id'],
             role=row['role'],
             content=row['content'] or '',
@@ -88,4 +93,5 @@ async def get_messages(
         )
         for row in rows
     ]
+    return Response(_MESSAGE_LIST.dump_json(messages), media_type="application/json")
 
@@ -2,9 +2,11 @@
 Desktop launcher for Lode using pywebview.
 """
 import os
+import re
 import sys
 from pathlib import Path
 import ctypes
+import hashlib
 import tempfile
 
 # Add project root to Python path so imports work
@@ -15,16 +17,34 @@ sys.path.insert(0, str(project_root))
 # If you want the Core build, set `LODE_BUILD_TYPE=core` in your environment.
 os.environ.setdefault("LODE_BUILD_TYPE", "pro")
 
-import webview
 import threading
 import time
 import subprocess
-import requests
-from backend.main import app
-import uvicorn
 import platform
 import socket
+import struct
 import atexit
+import signal
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+IS_WINDOWS = platform.system() == "Windows"
+
+# LODE_DEBUG_STARTUP=1 enables the extra startup/shutdown diagnostics.
+DEBUG_STARTUP = bool(os.environ.get("LODE_DEBUG_STARTUP"))
+
+# Lock file for preventing multiple instances: temp directory on Windows, /tmp on Linux/Mac.
+LOCK_FILE = (Path(tempfile.gettempdir()) if IS_WINDOWS else Path("/tmp")) / "lode.lock"
+
+
+def debug_startup(*lines):
+    """Write startup diagnostics (LODE_DEBUG_STARTUP only) as one block, one write."""
+    if DEBUG_STARTUP:
+        sys.stderr.write("".join(f"=== {line} ===\n" for line in lines))
+        sys.stderr.flush()
 
 
 class ServerThread(threading.Thread):
@@ -34,41 +54,392 @@ class ServerThread(threading.Thread):
         self.port = port
         self.server = None
         self.config = None
+        self.ready = threading.Event()
     
     def run(self):
         try:
-            self.config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="info")
-            self.server = uvicorn.Server(self.config)
+            # Imported here: only needed once the instance checks in main() have passed.
+            import uvicorn
+            from backend.main import app
+
+            class _ReadyServer(uvicorn.Server):
+                """uvicorn.Server that signals `ready` once startup has finished on its loop."""
+                async def startup(self, sockets=None):
+                    await super().startup(sockets=sockets)
+                    if self.started:
+                        self.ready.set()
+
+            # lifespan="on": a failing startup handler aborts startup instead of being ignored.
+            # timeout_graceful_shutdown: drop stuck connections, still run lifespan shutdown.
+            self.config = uvicorn.Config(
+                app, host="127.0.0.1", port=self.port, log_level="info", lifespan="on",
+                timeout_graceful_shutdown=3,
+            )
+            self.server = _ReadyServer(self.config)
+            self.server.ready = self.ready
+            # Server.run() sets up uvicorn's event loop (uvloop when installed) before serving.
             self.server.run()
         except Exception as e:
             print(f"ERROR in ServerThread: {e}")
             import traceback
             traceback.print_exc()
     
-    def shutdown(self):
+    def shutdown(self, grace_s=5.0):
+        """Ask uvicorn to exit gracefully (lifespan shutdown included); force it only after `grace_s`."""
         if self.server:
-            self.server.should_exit = True
-            # Force shutdown
+            # Open /api/jobs/stream responses would otherwise keep uvicorn draining.
             try:
-                import time
-                time.sleep(0.5)
-                if hasattr(self.server, 'force_exit'):
-                    self.server.force_exit = True
-            except:
+                from backend.jobs import close_job_streams
+                close_job_streams()
+            except Exception:
                 pass
+            self.server.should_exit = True
+            self.join(grace_s)
+            if self.is_alive():
+                self.server.force_exit = True
+
+
+# Keep-alive session for the launcher's requests-based HTTP calls.
+_http = None
+
+
+def _http_session():
+    global _http
+    if _http is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _http = requests.Session()
+        # One localhost host, no retries: a failed probe should fail fast.
+        _http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+        atexit.register(_http.close)
+    return _http
+
+
+# port -> (monotonic time, result) of the last /api/health probe.
+_our_server_cache = {}
+_OUR_SERVER_TTL = 0.5
 
 
 def is_our_server(port):
     """Check if the process on the port is our Lode server."""
+    cached = _our_server_cache.get(port)
+    if cached is not None and time.monotonic() - cached[0] < _OUR_SERVER_TTL:
+        return cached[1]
+    # HEAD + X-Lode header: no body to read or JSON to parse.
+    import http.client
+    import json
+    result = False
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=0.3)
+    try:
+        conn.request("HEAD", "/api/health")
+        response = conn.getresponse()
+        response.read()
+        if response.status == 200:
+            result = response.getheader("X-Lode") == "1"
+        elif response.status == 405:
+            # Lode builds without the HEAD route: check the JSON body instead.
+            conn.request("GET", "/api/health")
+            response = conn.getresponse()
+            if response.status == 200:
+                data = json.loads(response.read(64 * 1024))
+                result = isinstance(data, dict) and data.get('status') == 'ok'
+    except (OSError, ValueError, http.client.HTTPException):
+        pass
+    finally:
+        conn.close()
+    _our_server_cache[port] = (time.monotonic(), result)
+    return result
+
+
+def _windows_exe(*parts):
+    """Absolute path of a System32 tool (bare name if it isn't there)."""
+    path = Path(os.environ.get("SystemRoot", r"C:\Windows"), "System32", *parts)
+    return str(path) if path.exists() else parts[-1]
+
+
+# One `netstat -ano` listener row: Proto, Local Address, Foreign Address, State, PID.
+_NETSTAT_LISTEN_RE = re.compile(rb"^\s*TCP\s+\S+:(\d+)\s+\S+\s+LISTENING\s+(\d+)\s*$", re.MULTILINE)
+
+
+# GetExtendedTcpTable(TCP_TABLE_OWNER_PID_LISTENER) row layouts:
+# address family -> (row size, offset of dwLocalPort, offset of dwOwningPid).
+_TCP_TABLE_ROWS = {
+    socket.AF_INET: (24, 8, 20),    # MIB_TCPROW_OWNER_PID
+    socket.AF_INET6: (56, 20, 52),  # MIB_TCP6ROW_OWNER_PID
+}
+
+
+def _parse_tcp_table(buf, family, port):
+    """PIDs listening on `port` in a raw MIB_TCP(6)TABLE_OWNER_PID buffer."""
+    row_size, port_offset, pid_offset = _TCP_TABLE_ROWS[family]
+    (count,) = struct.unpack_from("<I", buf, 0)
+    pids = []
+    for i in range(count):
+        # Rows start after dwNumEntries; the port is in network byte order.
+        row = 4 + i * row_size
+        (raw_port,) = struct.unpack_from("<I", buf, row + port_offset)
+        if socket.ntohs(raw_port & 0xFFFF) == port:
+            pids.append(str(struct.unpack_from("<I", buf, row + pid_offset)[0]))
+    return pids
+
+
+def _windows_kernel32():
+    """kernel32 with prototypes for the process-wait calls (HANDLEs are pointer-sized)."""
+    from ctypes import wintypes
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+    kernel32.WaitForSingleObject.restype = wintypes.DWORD
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    kernel32.CloseHandle.restype = wintypes.BOOL
+    return kernel32
+
+
+def _windows_user32():
+    """user32 with prototypes for the icon calls (HICON/HWND are pointer-sized)."""
+    from ctypes import wintypes
+    user32 = ctypes.WinDLL("user32", use_last_error=True)
+    user32.LoadImageW.argtypes = [
+        wintypes.HINSTANCE, wintypes.LPCWSTR, wintypes.UINT, ctypes.c_int, ctypes.c_int, wintypes.UINT,
+    ]
+    user32.LoadImageW.restype = wintypes.HANDLE
+    user32.SendMessageW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+    user32.SendMessageW.restype = wintypes.LPARAM
+    return user32
+
+
+def _windows_tcp_listener_pids(port):
+    """Windows: PIDs listening on the port, from iphlpapi's TCP listener table."""
+    TCP_TABLE_OWNER_PID_LISTENER = 3
+    ERROR_INSUFFICIENT_BUFFER = 122
+    get_table = ctypes.windll.iphlpapi.GetExtendedTcpTable
+    pids = []
+    for family in (socket.AF_INET, socket.AF_INET6):
+        size = ctypes.c_ulong(0)
+        buf = None
+        while True:
+            # Size query first; retry if the table grew in between.
+            err = get_table(buf, ctypes.byref(size), False, family, TCP_TABLE_OWNER_PID_LISTENER, 0)
+            if err != ERROR_INSUFFICIENT_BUFFER:
+                break
+            buf = ctypes.create_string_buffer(size.value)
+        if err != 0:
+            raise OSError(err, "GetExtendedTcpTable failed")
+        if buf is not None:
+            pids.extend(_parse_tcp_table(buf.raw, family, port))
+    return list(dict.fromkeys(pids))
+
+
+def _proc_listener_pids(port):
+    """Linux: PIDs listening on the port, from /proc/net/tcp{,6} and /proc/*/fd."""
+    TCP_LISTEN = "0A"
+    port_hex = f":{port:04X}"
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f, None)  # header
+                for line in f:
+                    # sl, local_address, rem_address, st, tx:rx, tr:when, retrnsmt, uid, timeout, inode
+                    fields = line.split()
+                    if len(fields) > 9 and fields[3] == TCP_LISTEN and fields[1].endswith(port_hex):
+                        inodes.add(f"socket:[{fields[9]}]")
+        except OSError:
+            pass
+    if not inodes:
+        return []
+
+    pids = []
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with os.scandir(f"/proc/{entry.name}/fd") as fds:
+                for fd in fds:
+                    try:
+                        if os.readlink(fd.path) in inodes:
+                            pids.append(entry.name)
+                            break
+                    except OSError:
+                        pass
+        except OSError:
+            # Exited meanwhile, or another user's process.
+            pass
+    return pids
+
+
+def listening_pids(port):
+    """PIDs (as strings) of the processes listening on the TCP port."""
+    if psutil is not None:
+        try:
+            # dict.fromkeys: a dual-stack listener shows up once per address family.
+            return list(dict.fromkeys(
+                str(conn.pid)
+                for conn in psutil.net_connections(kind="inet")
+                if conn.pid and conn.laddr and conn.laddr.port == port
+                and conn.status == psutil.CONN_LISTEN
+            ))
+        except (psutil.AccessDenied, OSError):
+            # macOS needs root for other users' sockets; fall back to the CLI tools.
+            pass
+
+    if IS_WINDOWS:
+        try:
+            return _windows_tcp_listener_pids(port)
+        except (OSError, AttributeError):
+            pass
+        result = subprocess.run(
+            [_windows_exe("netstat.exe"), "-ano"],
+            capture_output=True,
+        )
+        return list(dict.fromkeys(
+            pid.decode() for listen_port, pid in _NETSTAT_LISTEN_RE.findall(result.stdout)
+            if int(listen_port) == port
+        ))
+
+    if os.path.exists("/proc/net/tcp"):
+        return _proc_listener_pids(port)
+
+    result = subprocess.run(
+        ["lsof", "-ti", f"TCP:{port}", "-sTCP:LISTEN"],
+        capture_output=True,
+        text=True
+    )
+    return result.stdout.split()
+
+
+def windows_process_cmdlines(pids):
+    """{pid: cmdline} for Windows processes, from one CIM query (wmic as fallback)."""
+    pids = [str(int(pid)) for pid in pids]
+    if not pids:
+        return {}
+    query = " OR ".join(f"ProcessId={pid}" for pid in pids)
     try:
-        response = requests.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
-        if response.status_code == 200:
-            data = response.json()
-            # Check if it's our API (has version field)
-            if isinstance(data, dict) and data.get('status') == 'ok':
-                return True
-    except:
+        result = subprocess.run(
+            [_windows_exe("WindowsPowerShell", "v1.0", "powershell.exe"), "-NoProfile", "-NonInteractive", "-Command",
+             f"Get-CimInstance Win32_Process -Filter '{query}' | "
+             "ForEach-Object { [string]$_.ProcessId + [char]9 + $_.CommandLine }"],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        if result.returncode == 0:
+            cmdlines = {}
+            for line in result.stdout.lstrip("\ufeff").splitlines():
+                pid, _, cmdline = line.partition("\t")
+                cmdlines[pid.strip()] = cmdline.strip()
+            return cmdlines
+    except OSError:
         pass
+    cmdlines = {}
+    for pid in pids:
+        result = subprocess.run(
+            [_windows_exe("wbem", "WMIC.exe"), "process", "where", f"ProcessId={pid}", "get", "CommandLine"],
+            capture_output=True,
+            text=True,
+        )
+        cmdlines[pid] = result.stdout
+    return cmdlines
+
+
+def posix_process_cmdlines(pids):
+    """{pid: cmdline} for Linux/Mac processes, from /proc or one `ps` call."""
+    if not pids:
+        return {}
+    if os.path.isdir("/proc/self"):
+        cmdlines = {}
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    cmdlines[pid] = f.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+            except OSError:
+                pass  # the process is gone
+        return cmdlines
+    result = subprocess.run(
+        ["ps", "-p", ",".join(str(pid) for pid in pids), "-o", "pid=,command="],
+        capture_output=True,
+        text=True
+    )
+    cmdlines = {}
+    for line in result.stdout.splitlines():
+        pid, _, cmdline = line.strip().partition(" ")
+        cmdlines[pid] = cmdline.strip()
+    return cmdlines
+
+
+def process_cmdlines(pids):
+    """{pid: command line} for the given PIDs; PIDs that can't be read are left out."""
+    if psutil is not None:
+        cmdlines = {}
+        for pid in pids:
+            try:
+                cmdlines[pid] = " ".join(psutil.Process(int(pid)).cmdline())
+            except (psutil.Error, ValueError):
+                pass
+        return cmdlines
+    if IS_WINDOWS:
+        return windows_process_cmdlines(pids)
+    return posix_process_cmdlines(pids)
+
+
+def is_lode_server_cmdline(cmdline):
+    """Only Python running backend.main, or uvicorn with our app, or the launcher counts."""
+    cmdline = cmdline.lower()
+    return ("python" in cmdline and
+            ("backend.main" in cmdline or
+             "uvicorn" in cmdline and "backend.main:app" in cmdline or
+             "app/launcher.py" in cmdline))
+
+
+def kill_process(pid):
+    """Forcefully terminate a process (psutil, taskkill on Windows, SIGKILL elsewhere)."""
+    if psutil is not None:
+        psutil.Process(int(pid)).kill()
+    elif IS_WINDOWS:
+        subprocess.run([_windows_exe("taskkill.exe"), "/F", "/PID", str(pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        os.kill(int(pid), signal.SIGKILL)
+
+
+def wait_for_exit(pid, timeout_s=2.0):
+    """Wait for the process to exit; False on timeout or when it can't be waited on."""
+    pid = int(pid)
+    if psutil is not None:
+        try:
+            psutil.Process(pid).wait(timeout_s)
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.TimeoutExpired:
+            return False
+        return True
+    if IS_WINDOWS:
+        SYNCHRONIZE = 0x00100000
+        WAIT_OBJECT_0 = 0
+        kernel32 = _windows_kernel32()
+        handle = kernel32.OpenProcess(SYNCHRONIZE, False, pid)
+        if not handle:
+            return True  # already gone (or not ours to wait on)
+        try:
+            return kernel32.WaitForSingleObject(handle, int(timeout_s * 1000)) == WAIT_OBJECT_0
+        finally:
+            kernel32.CloseHandle(handle)
+    if hasattr(os, "pidfd_open"):
+        import select
+        try:
+            fd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+        try:
+            poller = select.poll()
+            poller.register(fd, select.POLLIN)
+            return bool(poller.poll(int(timeout_s * 1000)))
+        finally:
+            os.close(fd)
     return False
 
 
@@ -79,178 +450,195 @@ def kill_lode_server(port):
         print(f"Port {port} is in use, but it's not a Lode server. Skipping cleanup.")
         return False
     
-    if platform.system() == "Windows":
-        try:
-            # Find process using the port
-            result = subprocess.run(
-                ["netstat", "-ano"],
-                capture_output=True,
-                text=True,
-                shell=True
-            )
-            lines = result.stdout.split('\n')
-            pids = []
-            for line in lines:
-                if f":{port}" in line and "LISTENING" in line:
-                    parts = line.split()
-                    if len(parts) > 4:
-                        pid = parts[-1]
-                        if pid.isdigit():
-                            pids.append(pid)
-            
-            # Verify it's a Python process running our server before killing
-            for pid in set(pids):
-                try:
-                    # Check process command line to verify it's our server
-                    result = subprocess.run(
-                        ["wmic", "process", "where", f"ProcessId={pid}", "get", "CommandLine"],
-                        capture_output=True,
-                        text=True,
-                        shell=True
-                    )
-                    cmdline = result.stdout.lower()
-                    # Only kill if it's Python running backend.main or uvicorn with our app
-                    if ("python" in cmdline and 
-                        ("backend.main" in cmdline or 
-                         "uvicorn" in cmdline and "backend.main:app" in cmdline or
-                         "app/launcher.py" in cmdline)):
-                        print(f"Killing Lode server process {pid} on port {port}...")
-                        subprocess.run(["taskkill", "/F", "/PID", pid], 
-                                     capture_output=True, shell=True)
-                        time.sleep(0.5)
-                        return True
-                except Exception as e:
-                    print(f"Could not verify/kill process {pid}: {e}")
-        except Exception as e:
-            print(f"Error checking port {port}: {e}")
-    else:
-        # Linux/Mac - check if it's our process
-        try:
-            result = subprocess.run(
-                ["lsof", "-ti", f":{port}"],
-                capture_output=True,
-                text=True
-            )
-            if result.stdout.strip():
-                pids = result.stdout.strip().split('\n')
-                for pid in pids:
-                    try:
-                        # Check process command
-                        result = subprocess.run(
-                            ["ps", "-p", pid, "-o", "command="],
-                            capture_output=True,
-                            text=True
-                        )
-                        cmdline = result.stdout.lower()
-                        if ("python" in cmdline and 
-                            ("backend.main" in cmdline or 
-                             "uvicorn" in cmdline and "backend.main:app" in cmdline or
-                             "app/launcher.py" in cmdline)):
-                            print(f"Killing Lode server process {pid} on port {port}...")
-                            subprocess.run(["kill", "-9", pid], capture_output=True)
-                            return True
-                    except:
-                        pass
-        except:
-            pass
+    try:
+        # Find process using the port
+        pids = listening_pids(port)
+        
+        # Verify it's a Python process running our server before killing
+        cmdlines = process_cmdlines(pids)
+        for pid in pids:
+            if not is_lode_server_cmdline(cmdlines.get(pid, "")):
+                continue
+            print(f"Killing Lode server process {pid} on port {port}...")
+            try:
+                kill_process(pid)
+            except Exception as e:
+                print(f"Could not verify/kill process {pid}: {e}")
+                continue
+            wait_for_exit(pid)
+            _our_server_cache.pop(port, None)
+            return True
+    except Exception as e:
+        print(f"Error checking port {port}: {e}")
     return False
 
 
-def get_lock_file_path():
-    """Get path to lock file for preventing multiple instances."""
-    if platform.system() == "Windows":
-        # Use temp directory
-        import tempfile
-        return Path(tempfile.gettempdir()) / "lode.lock"
-    else:
-        # Linux/Mac: use /tmp
-        return Path("/tmp") / "lode.lock"
-
-
 def is_port_in_use(port):
-    """Check if a port is in use."""
+    """Check if a port is in use (by trying to bind it, as uvicorn will)."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        return s.connect_ex(('127.0.0.1', port)) == 0
+        # SO_REUSEADDR ignores TIME_WAIT like uvicorn; on Windows it would allow
+        # binding over a live listener, hence SO_EXCLUSIVEADDRUSE there.
+        if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(('127.0.0.1', port))
+        except OSError:
+            return True
+        return False
 
 
-def check_existing_instance(port):
-    """Check if another Lode instance is running."""
-    # Check lock file
-    lock_file = get_lock_file_path()
-    if lock_file.exists():
-        try:
-            # Read PID from lock file
-            pid = int(lock_file.read_text().strip())
-            # Check if process is still running
-            if platform.system() == "Windows":
-                result = subprocess.run(
-                    ["tasklist", "/FI", f"PID eq {pid}"],
-                    capture_output=True,
-                    text=True,
-                    shell=True
-                )
-                if str(pid) in result.stdout:
-                    # Process exists, check if it's our server
-                    if is_our_server(port):
-                        return True, pid
-            else:
-                try:
-                    os.kill(pid, 0)  # Check if process exists
-                    if is_our_server(port):
-                        return True, pid
-                except OSError:
-                    # Process doesn't exist, remove stale lock file
-                    lock_file.unlink(missing_ok=True)
-        except (ValueError, FileNotFoundError):
-            # Invalid lock file, remove it
-            lock_file.unlink(missing_ok=True)
-    
-    # Check if port is in use and it's our server
-    if is_port_in_use(port) and is_our_server(port):
+# The open, locked lock file (the OS releases the lock when the process exits).
+_lock_handle = None
+
+# Windows locks are mandatory: lock a byte past the PID text so it stays readable.
+_LOCK_OFFSET = 64
+
+
+def _try_lock(f):
+    """Take a non-blocking exclusive lock on the open file; False if another process holds it."""
+    try:
+        if IS_WINDOWS:
+            import msvcrt
+            f.seek(_LOCK_OFFSET)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _acquire_instance_lock():
+    """Take the single-instance lock if free; returns (acquired, holder_pid or None)."""
+    global _lock_handle
+    if _lock_handle is not None:
         return True, None
-    
+    f = open(LOCK_FILE, "a+")
+    if _try_lock(f):
+        _lock_handle = f
+        return True, None
+    # Read PID of the lock holder
+    try:
+        f.seek(0)
+        pid = int(f.read(_LOCK_OFFSET).strip())
+    except (ValueError, OSError):
+        pid = None
+    f.close()
+    return False, pid
+
+
+def check_existing_instance():
+    """Check if another Lode instance is running (takes the lock if it's free)."""
+    acquired, pid = _acquire_instance_lock()
+    if not acquired:
+        return True, pid
     return False, None
 
 
 def create_lock_file():
     """Create lock file with current process ID."""
-    lock_file = get_lock_file_path()
-    lock_file.write_text(str(os.getpid()))
-    
-    # Register cleanup on exit
-    def cleanup_lock():
-        if lock_file.exists():
-            try:
-                lock_file.unlink()
-            except:
-                pass
-    
-    atexit.register(cleanup_lock)
-    return lock_file
+    acquired, _ = _acquire_instance_lock()
+    if not acquired:
+        raise RuntimeError("Another Lode instance holds the lock file")
+    _lock_handle.seek(0)
+    _lock_handle.truncate()
+    _lock_handle.write(str(os.getpid()))
+    _lock_handle.flush()
+
+    # Not unlinked at exit: a late opener could otherwise lock a different file.
+    atexit.register(_lock_handle.close)
+    return LOCK_FILE
+
+
+def wait_for_port_free(port, timeout_s=2.0):
+    """Wait for a killed server to release the port; False if still held at the deadline."""
+    deadline = time.monotonic() + timeout_s
+    delay = 0.02
+    while is_port_in_use(port):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.2)
+    return True
+
+
+def wait_for_server(server_thread, timeout_s=15.0):
+    """Wait for server to be ready; False if the server thread dies or the timeout passes."""
+    # Short slices, so a thread that died during startup is noticed right away.
+    deadline = time.monotonic() + timeout_s
+    while not server_thread.ready.wait(0.05):
+        if not server_thread.is_alive() or time.monotonic() >= deadline:
+            return False
+    return True
+
+
+WINDOW_ICON_ICO = project_root / "docs" / "images" / "lode.ico"
+TASKBAR_MASTER_PNG = project_root / "docs" / "images" / "master.png"
+
+# Shown while the server starts; replaced via window.load_url() once it's ready.
+SPLASH_HTML = """<!doctype html>
+<html><body style="margin:0;height:100vh;display:flex;align-items:center;justify-content:center;
+font-family:system-ui,sans-serif;color:#666;background:#fff">Starting Lode&hellip;</body></html>"""
+
+
+def prepare_taskbar_icon(png_path):
+    """Convert master.png to a temp .ico for the Windows taskbar icon; None on failure."""
+    # Named after the PNG's content hash: converted (and Pillow imported) once per image.
+    try:
+        digest = hashlib.blake2b(png_path.read_bytes(), digest_size=8).hexdigest()
+    except OSError as e:
+        print(f"Taskbar icon not readable: {png_path} ({e})")
+        return None
+    tmp_ico = Path(tempfile.gettempdir()) / f"lode_taskbar_master_{digest}.ico"
+    if tmp_ico.exists():
+        return tmp_ico
 
+    try:
+        from PIL import Image
+    except Exception as e:
+        print("Pillow is required to set taskbar icon from master.png. Install requirements.txt.")
+        print(f"Import error: {e}")
+        return None
 
-def wait_for_server(port, max_retries=30):
-    """Wait for server to be ready."""
-    for i in range(max_retries):
-        try:
-            response = requests.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
-            if response.status_code == 200:
-                return True
-        except:
-            if i == max_retries - 1:
-                return False
-            time.sleep(0.5)
-    return False
+    try:
+        # Write to a private name first so a concurrent launch never sees a partial .ico.
+        partial = tmp_ico.with_name(f"{tmp_ico.stem}.{os.getpid()}.tmp")
+        img = Image.open(png_path).convert("RGBA")
+        img.save(
+            partial,
+            format="ICO",
+            sizes=[(16, 16), (32, 32), (48, 48), (64, 64), (128, 128), (256, 256)],
+        )
+        os.replace(partial, tmp_ico)
+        debug_startup(f"Converted {png_path} to {tmp_ico}")
+    except Exception as e:
+        print(f"Failed converting {png_path} to {tmp_ico}: {e}")
+        return None
+    return tmp_ico
 
 
 def main():
     """Launch the desktop application."""
+    # Check for existing instance (lock file) first, before touching the port or the backend.
+    has_instance, existing_pid = check_existing_instance()
+    if has_instance:
+        if existing_pid:
+            print(f"Another Lode instance is already running (PID: {existing_pid})")
+        else:
+            print("Another Lode instance is already running.")
+        print("Please close that instance first or wait for it to finish.")
+        sys.exit(1)
+    
     # Load configured port (default 8000)
-    from backend.config import get_port, set_port
+    from backend.config import get_port
     
     port = get_port()
     
-    # Check if port is in use
+    # We hold the lock, so a Lode server still on the port is a leftover.
     if is_port_in_use(port):
         # Check if it's our server
         if is_our_server(port):
@@ -259,7 +647,8 @@ def main():
             print("Attempting to clean up...")
             if kill_lode_server(port):
                 print("Cleaned up old Lode server process.")
-                time.sleep(2)  # Give process time to die
+                # The socket may outlive the killed process briefly.
+                wait_for_port_free(port)
             else:
                 print(f"ERROR: Could not clean up. Port {port} is in use.")
                 print("Please stop that application or change the port in Settings.")
@@ -275,65 +664,90 @@ def main():
             print(f"  4. Restart Lode")
             sys.exit(1)
     
-    # Check for existing instance (lock file)
-    has_instance, existing_pid = check_existing_instance(port)
-    if has_instance:
-        if existing_pid:
-            print(f"Another Lode instance is already running (PID: {existing_pid})")
-            print("Please close that instance first or wait for it to finish.")
-            sys.exit(1)
-    
     # Create lock file to prevent multiple instances
     create_lock_file()
     
     # FastAPI serves HTML directly - no Vite/React needed
     frontend_url = f"http://127.0.0.1:{port}"
-    print(f"FastAPI will serve HTML directly at {frontend_url}")
+    debug_startup(f"FastAPI will serve HTML directly at {frontend_url}")
     
+
     # Start FastAPI server
     server_thread = ServerThread(port)
     server_thread.start()
-    
-    # Wait for server
-    if not wait_for_server(port):
-        print("Failed to start server")
-        sys.exit(1)
-    
-    # Create webview window
-    print(f"=== CREATING WEBVIEW WITH URL: {frontend_url} ===")
-    print(f"=== Testing if URL is accessible... ===")
-    try:
-        test_res = requests.get(frontend_url, timeout=5)
-        print(f"=== URL test: Status {test_res.status_code}, Content length: {len(test_res.text)} ===")
-        if len(test_res.text) < 100:
-            print(f"=== WARNING: Very little content returned! ===")
-        # Check if it's HTML
-        if '<html' in test_res.text.lower() or '<!doctype' in test_res.text.lower():
-            print(f"=== Content appears to be HTML ===")
-        else:
-            print(f"=== WARNING: Content doesn't look like HTML! ===")
-            print(f"=== First 200 chars: {test_res.text[:200]} ===")
-    except Exception as e:
-        print(f"=== URL test FAILED: {e} ===")
-        import traceback
-        traceback.print_exc()
-    
-    # No browser test - just open webview directly
-    
-    window_icon_ico = project_root / "docs" / "images" / "lode.ico"
-    taskbar_master_png = project_root / "docs" / "images" / "master.png"
 
+    # pywebview loads its GUI backend on import; do it while the server boots.
+    import webview
+    
+    # Wait for the server while the taskbar icon is converted and the window is built.
+    from concurrent.futures import ThreadPoolExecutor
+    startup_pool = ThreadPoolExecutor(max_workers=2)
+    server_ready = startup_pool.submit(wait_for_server, server_thread)
+    taskbar_ico_future = None
+    if IS_WINDOWS:
+        taskbar_ico_future = startup_pool.submit(prepare_taskbar_icon, TASKBAR_MASTER_PNG)
+    startup_pool.shutdown(wait=False)
+
+    # Show the window right away with a splash page; _load_when_ready() swaps in the app.
     window = webview.create_window(
         title="Lode",
-        url=frontend_url,
+        html=SPLASH_HTML,
         width=1400,
         height=900,
         min_size=(1000, 700),
         # Critical UX: allow selecting/copying text everywhere (default browser behavior).
         text_select=True,
     )
-    print(f"=== Webview created, URL should be: {frontend_url} ===")
-    print(f"=== Window object: {window} ===")
+    debug_startup(
+        f"Webview created, will load: {frontend_url}",
+        f"Window object: {window}",
+    )
+
+    startup_failed = False
+
+    def _load_when_ready():
+        """Called by webview.start() in a background thread once the GUI is up."""
+        nonlocal startup_failed
+        if not icons_hooked:
+            _set_windows_window_and_taskbar_icons()
+
+        if not server_ready.result():
+            print("Failed to start server")
+            startup_failed = True
+            window.destroy()
+            return
+
+        # Fetching the page again only helps when debugging a blank window.
+        if DEBUG_STARTUP:
+            lines = ["Testing if URL is accessible..."]
+            try:
+                session = _http_session()
+                test_res = session.head(frontend_url, timeout=5)
+                content_type = test_res.headers.get("content-type", "")
+                lines.append(f"URL test: Status {test_res.status_code}, Content-Type: {content_type or '(none)'}")
+                if test_res.status_code == 200 and content_type.startswith("text/html"):
+                    lines.append("Content appears to be HTML")
+                else:
+                    # HEAD unsupported or not HTML: look at the start of the body only.
+                    with session.get(frontend_url, timeout=5, stream=True) as res:
+                        head = next(res.iter_content(chunk_size=4096), b"")
+                    text = head.decode("utf-8", "replace")
+                    lines.append(
+                        f"URL test (GET): Status {res.status_code}, "
+                        f"Content-Length: {res.headers.get('content-length', 'unknown')}"
+                    )
+                    if '<html' in text.lower() or '<!doctype' in text.lower():
+                        lines.append("Content appears to be HTML")
+                    else:
+                        lines.append("WARNING: Content doesn't look like HTML!")
+                        lines.append(f"First 200 chars: {text[:200]}")
+            except Exception as e:
+                import traceback
+                lines.append(f"URL test FAILED: {e}\n{traceback.format_exc()}")
+            debug_startup(*lines)
+
+        debug_startup(f"LOADING WEBVIEW URL: {frontend_url}")
+        window.load_url(frontend_url)
     
     def _set_windows_window_and_taskbar_icons():
         """
@@ -341,48 +755,25 @@ def main():
         - Set SMALL icon (window/titlebar) from lode.ico
         - Set BIG icon (taskbar) from master.png (converted to a temp .ico).
         
-        This function is called by webview.start() when the window is created.
-        We use a small delay to ensure the window handle is available.
+        Hooked to the window's `shown` event, so the native handle already
+        exists; falls back to being called from _load_when_ready() on pywebview
+        versions without window events.
         """
-        if platform.system() != "Windows":
+        if not IS_WINDOWS:
             return
 
-        def _set_icons_with_delay():
-            """Set icons after a short delay to ensure window handle is available."""
-            # Give the window time to fully initialize
-            time.sleep(0.5)
-            
-            if not window_icon_ico.exists():
-                print(f"Window icon not found: {window_icon_ico}")
-            if not taskbar_master_png.exists():
-                print(f"Taskbar icon not found: {taskbar_master_png}")
+        def _set_icons():
+            """Set icons on the native window."""
+            # (A missing master.png is reported by prepare_taskbar_icon().)
+            has_window_icon = WINDOW_ICON_ICO.exists()
+            if not has_window_icon:
+                print(f"Window icon not found: {WINDOW_ICON_ICO}")
 
             try:
-                from PIL import Image
-            except Exception as e:
-                print("Pillow is required to set taskbar icon from master.png. Install requirements.txt.")
-                print(f"Import error: {e}")
-                return
+                # Converted while the server was starting (see main()).
+                tmp_ico = taskbar_ico_future.result() if taskbar_ico_future else None
 
-            try:
-                # Convert master.png -> temp ico (Windows APIs expect .ico for setting HICON easily)
-                tmp_ico = Path(tempfile.gettempdir()) / "lode_taskbar_master.ico"
-                try:
-                    if taskbar_master_png.exists() and (
-                        (not tmp_ico.exists()) or (tmp_ico.stat().st_mtime < taskbar_master_png.stat().st_mtime)
-                    ):
-                        img = Image.open(taskbar_master_png).convert("RGBA")
-                        img.save(
-                            tmp_ico,
-                            format="ICO",
-                            sizes=[(16, 16), (32, 32), (48, 48), (64, 64), (128, 128), (256, 256)],
-                        )
-                        print(f"Converted {taskbar_master_png} to {tmp_ico}")
-                except Exception as e:
-                    print(f"Failed converting {taskbar_master_png} to {tmp_ico}: {e}")
-                    tmp_ico = None
-
-                # Try multiple times to get the window handle (window might not be ready immediately)
+                # The handle is normally there by `shown`; retry briefly in case it isn't.
                 hwnd = None
                 for attempt in range(5):
                     try:
@@ -400,17 +791,17 @@ def main():
                                     except Exception:
                                         pass
                         if not hwnd:
-                            time.sleep(0.2)  # Wait a bit and try again
+                            time.sleep(0.05)  # Wait a bit and try again
                     except Exception as e:
-                        print(f"Attempt {attempt + 1} to get window handle failed: {e}")
-                        time.sleep(0.2)
+                        debug_startup(f"Attempt {attempt + 1} to get window handle failed: {e}")
+                        time.sleep(0.05)
 
                 if not hwnd:
                     print("Could not resolve native window handle (HWND) after multiple attempts; skipping icon override.")
                     print("Note: Taskbar icon may only update after packaging the app as an executable.")
                     return
 
-                user32 = ctypes.windll.user32
+                user32 = _windows_user32()
                 WM_SETICON = 0x0080
                 ICON_SMALL = 0
                 ICON_BIG = 1
@@ -419,10 +810,10 @@ def main():
                 LR_DEFAULTSIZE = 0x0040
 
                 # Window/titlebar icon (small)
-                if window_icon_ico.exists():
+                if has_window_icon:
                     hicon_small = user32.LoadImageW(
                         None,
-                        str(window_icon_ico),
+                        str(WINDOW_ICON_ICO),
                         IMAGE_ICON,
                         0,
                         0,
@@ -430,10 +821,10 @@ def main():
                     )
                     if hicon_small:
                         user32.SendMessageW(hwnd, WM_SETICON, ICON_SMALL, hicon_small)
-                        print(f"Set Windows window icon (small) from {window_icon_ico}")
+                        debug_startup(f"Set Windows window icon (small) from {WINDOW_ICON_ICO}")
                     else:
                         error_code = ctypes.get_last_error()
-                        print(f"LoadImageW failed for small icon: {window_icon_ico} (error: {error_code})")
+                        print(f"LoadImageW failed for small icon: {WINDOW_ICON_ICO} (error: {error_code})")
 
                 # Taskbar icon (big)
                 if tmp_ico and Path(tmp_ico).exists():
@@ -447,11 +838,7 @@ def main():
                     )
                     if hicon_big:
                         user32.SendMessageW(hwnd, WM_SETICON, ICON_BIG, hicon_big)
-                        print(f"Set Windows taskbar icon (big) from {taskbar_master_png} (via {tmp_ico})")
-                        print("Note: Windows may cache the taskbar icon. If it doesn't update, try:")
-                        print("  1. Restart the application")
-                        print("  2. Clear Windows icon cache (restart explorer.exe)")
-                        print("  3. The icon will definitely work after packaging as an executable")
+                        debug_startup(f"Set Windows taskbar icon (big) from {TASKBAR_MASTER_PNG} (via {tmp_ico})")
                     else:
                         error_code = ctypes.get_last_error()
                         print(f"LoadImageW failed for big icon: {tmp_ico} (error: {error_code})")
@@ -463,9 +850,17 @@ def main():
                 traceback.print_exc()
         
         # Run icon setting in a separate thread to avoid blocking
-        icon_thread = threading.Thread(target=_set_icons_with_delay, daemon=True)
+        icon_thread = threading.Thread(target=_set_icons, daemon=True)
         icon_thread.start()
 
+    icons_hooked = False
+    if IS_WINDOWS:
+        try:
+            window.events.shown += _set_windows_window_and_taskbar_icons  # type: ignore[attr-defined]
+            icons_hooked = True
+        except Exception:
+            pass
+
     cleanup_ran = False
 
     # Prefer a real close event hook when available (some platforms don't unwind
@@ -481,34 +876,42 @@ def main():
         if cleanup_ran:
             return
         cleanup_ran = True
-        print("=== CLEANUP STARTING ===")
+        debug_startup("CLEANUP STARTING")
 
-        # If something keeps the process alive (e.g., non-daemon worker threads from the
-        # embedded server stack), force-exit after a short grace period so Lode.exe
-        # never lingers after the UI closes.
+        # Last resort if something keeps the process alive after cleanup, so Lode.exe never lingers.
         def _force_exit():
             try:
-                print("=== FORCE EXIT (watchdog) ===")
+                lingering = [
+                    t.name for t in threading.enumerate()
+                    if t is not threading.current_thread() and not t.daemon and t.is_alive()
+                ]
+                print(f"=== FORCE EXIT (watchdog); still running: {', '.join(lingering) or 'none'} ===")
+                # os._exit skips interpreter shutdown, so flush what's buffered ourselves.
+                sys.stdout.flush()
+                sys.stderr.flush()
             finally:
                 os._exit(0)
 
-        watchdog = threading.Timer(8.0, _force_exit)
+        watchdog = threading.Timer(12.0, _force_exit)
         watchdog.daemon = True
         watchdog.start()
 
         try:
             # Signal any running vectordb index job to stop so indexing doesn't keep running
             try:
-                from backend.job_runner import cancel_all_vectordb_jobs
+                from backend.job_runner import cancel_all_vectordb_jobs, vectordb_jobs_running
                 cancel_all_vectordb_jobs()
-                time.sleep(2)  # give indexer time to notice and exit
+                # Give indexer time to notice and exit, but no longer than it needs.
+                deadline = time.monotonic() + 2.0
+                while vectordb_jobs_running() and time.monotonic() < deadline:
+                    time.sleep(0.05)
             except Exception as e:
                 print(f"Error signalling jobs to stop: {e}")
             server_thread.shutdown()
-            print("Server thread shutdown called")
-            # Give the server thread a moment to exit cleanly.
+            debug_startup("Server thread shutdown called")
+            # shutdown() already waited out the graceful period; this covers a forced exit.
             try:
-                server_thread.join(timeout=5)
+                server_thread.join(timeout=2)
                 if server_thread.is_alive():
                     print("WARNING: server thread still alive after shutdown; watchdog will force-exit soon.")
             except Exception as e:
@@ -517,15 +920,27 @@ def main():
             print(f"Error shutting down server: {e}")
         
         # No Vite process to clean up
-        print("=== CLEANUP COMPLETE ===")
+        debug_startup("CLEANUP COMPLETE")
     
+    # Run cleanup on every way out: atexit, and termination signals turned into SystemExit.
+    atexit.register(on_closed)
+
+    def _exit_on_signal(signum, frame):
+        sys.exit(0)
+
+    for sig_name in ("SIGTERM", "SIGBREAK"):
+        if hasattr(signal, sig_name):
+            try:
+                signal.signal(getattr(signal, sig_name), _exit_on_signal)
+            except (ValueError, OSError):
+                pass
+
     # Start webview (debug disabled - no devtools)
     # webview.start() blocks until the window is closed
     try:
-        print("=== STARTING WEBVIEW ===")
-        print("=== webview.start() will block until window is closed ===")
-        webview.start(_set_windows_window_and_taskbar_icons, debug=False)
-        print("=== webview.start() returned - window was closed ===")
+        debug_startup("STARTING WEBVIEW", "webview.start() will block until window is closed")
+        webview.start(_load_when_ready, debug=False)
+        debug_startup("webview.start() returned - window was closed")
     except KeyboardInterrupt:
         print("Keyboard interrupt received")
     except Exception as e:
@@ -533,9 +948,12 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
-        print("=== FINALLY BLOCK - CLEANUP ===")
+        debug_startup("FINALLY BLOCK - CLEANUP")
         on_closed()
 
+    if startup_failed:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -4,62 +4,220 @@ Server-side analytics cache stored in SQLite.
 Why:
 - The UI should not recompute analytics on every tab switch.
 - Refresh should recompute analytics ONCE, then all tabs should be up-to-date.
+- Imports change the underlying data, so they invalidate the cache; entries
+  also expire after CACHE_TTL_SECONDS as a backstop for any other writer.
 """
 
 from __future__ import annotations
 
 import json
 import sqlite3
+import threading
 import time
-from typing import Any, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
+# Optional: orjson encodes/decodes the cached blobs several times faster.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def ensure_cache_table(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS analytics_cache (
-            cache_key TEXT PRIMARY KEY,
-            value_json TEXT NOT NULL,
-            updated_at REAL NOT NULL
-        )
-        """
-    )
-    conn.execute(
-        "CREATE INDEX IF NOT EXISTS idx_analytics_cache_updated_at ON analytics_cache(updated_at)"
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+def _dumps(value: Any):
+    if orjson is not None:
+        # bytes, stored as-is; both decoders below accept bytes and str.
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value)
+
+
+def _loads(payload):
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+_DDL_STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS analytics_cache (
+        cache_key TEXT PRIMARY KEY,
+        value_json TEXT NOT NULL,
+        updated_at REAL NOT NULL
     )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_analytics_cache_updated_at ON analytics_cache(updated_at)",
+)
+_DDL_SQL = ";\n".join(statement.strip() for statement in _DDL_STATEMENTS) + ";"
+
+
+def ensure_cache_table(conn: sqlite3.Connection) -> None:
+    # executescript() would COMMIT the caller's open transaction first, so
+    # only batch the DDL when there is none.
+    if conn.in_transaction:
+        for statement in _DDL_STATEMENTS:
+            conn.execute(statement)
+    else:
+        conn.executescript(_DDL_SQL)
+
 
+_UPSERT_SQL = """
+    INSERT INTO analytics_cache(cache_key, value_json, updated_at)
+    VALUES(?, ?, ?)
+    ON CONFLICT(cache_key) DO UPDATE SET
+        value_json=excluded.value_json,
+        updated_at=excluded.updated_at
+"""
 
-def get_cached(conn: sqlite3.Connection, cache_key: str) -> Optional[Any]:
+
+def _execute(conn: sqlite3.Connection, method: str, sql: str, params) -> sqlite3.Cursor:
+    """
+    Run a statement against analytics_cache, creating the table only if the
+    statement fails for lack of it (the table normally exists already, so the
+    DDL is not re-run on every call).
+    """
+    try:
+        return getattr(conn, method)(sql, params)
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
     ensure_cache_table(conn)
+    return getattr(conn, method)(sql, params)
+
+
+# Decoded values of recently read/written keys:
+# (database file, cache_key) -> (updated_at, value).
+# An entry is only used while its updated_at still matches the row in SQLite,
+# so a hit skips reading and decoding the blob but never serves stale data.
+_MEMORY_MAX_ENTRIES = 256
+_memory: OrderedDict[Tuple[str, str], Tuple[float, Any]] = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _database_id(conn: sqlite3.Connection) -> str:
+    """The file behind `conn`'s main database (per-connection for in-memory ones)."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main" and path:
+            return path
+    return f":memory:{id(conn)}"
+
+
+def _remember(key: Tuple[str, str], updated_at: float, value: Any) -> None:
+    with _memory_lock:
+        _memory[key] = (updated_at, value)
+        _memory.move_to_end(key)
+        while len(_memory) > _MEMORY_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def get_cached(
+    conn: sqlite3.Connection,
+    cache_key: str,
+    max_age: Optional[float] = CACHE_TTL_SECONDS,
+) -> Optional[Any]:
+    row = _execute(
+        conn,
+        "execute",
+        "SELECT updated_at FROM analytics_cache WHERE cache_key = ?",
+        (cache_key,),
+    ).fetchone()
+    if not row:
+        return None
+    if max_age is not None and time.time() - row[0] > max_age:
+        return None
+
+    key = (_database_id(conn), cache_key)
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is not None and entry[0] == row[0]:
+            _memory.move_to_end(key)
+            return entry[1]
+
     row = conn.execute(
-        "SELECT value_json FROM analytics_cache WHERE cache_key = ?",
+        "SELECT value_json, updated_at FROM analytics_cache WHERE cache_key = ?",
         (cache_key,),
     ).fetchone()
     if not row:
         return None
     try:
-        return json.loads(row[0])
+        value = _loads(row[0])
     except Exception:
         return None
+    _remember(key, row[1], value)
+    return value
 
 
 def set_cached(conn: sqlite3.Connection, cache_key: str, value: Any) -> None:
-    ensure_cache_table(conn)
-    payload = json.dumps(value)
     now = time.time()
-    conn.execute(
-        """
-        INSERT INTO analytics_cache(cache_key, value_json, updated_at)
-        VALUES(?, ?, ?)
-        ON CONFLICT(cache_key) DO UPDATE SET
-            value_json=excluded.value_json,
-            updated_at=excluded.updated_at
-        """,
-        (cache_key, payload, now),
-    )
+    _execute(conn, "execute", _UPSERT_SQL, (cache_key, _dumps(value), now))
+    _remember((_database_id(conn), cache_key), now, value)
+
+
+def set_cached_many(conn: sqlite3.Connection, items: Dict[str, Any]) -> None:
+    """set_cached for several keys with one prepared statement."""
+    now = time.time()
+    rows = [(cache_key, _dumps(value), now) for cache_key, value in items.items()]
+    _execute(conn, "executemany", _UPSERT_SQL, rows)
+    database = _database_id(conn)
+    for cache_key, value in items.items():
+        _remember((database, cache_key), now, value)
 
 
 def clear_cache(conn: sqlite3.Connection) -> None:
-    ensure_cache_table(conn)
-    conn.execute("DELETE FROM analytics_cache")
+    _execute(conn, "execute", "DELETE FROM analytics_cache", ())
+    database = _database_id(conn)
+    with _memory_lock:
+        for key in [key for key in _memory if key[0] == database]:
+            del _memory[key]
+
 
+def invalidate_cache(db_path: str) -> None:
+    """Drop all cached analytics for `db_path` (call after the data changes)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        clear_cache(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def precompute_analytics(db_path: str) -> None:
+    """
+    Recompute every analytics result the UI asks for by default and cache it.
+
+    Results are computed first and written in one transaction afterwards:
+    the analytics functions maintain their own per-day and n-gram tables in
+    the same database, so holding the cache write lock meanwhile would block
+    them.
+    """
+    import analytics
+
+    results = {}
+
+    # Usage: day/week/month (no explicit range)
+    for p in ("day", "week", "month"):
+        results[f"usage:{p}"] = analytics.usage_over_time(db_path=db_path, period=p)
+
+    # Streaks
+    results["streaks"] = analytics.longest_streak(db_path)
+
+    # Top words/phrases (UI defaults)
+    # Note: bump cache key when filtering behavior changes.
+    results["top_words_v3:50"] = analytics.top_words(db_path, limit=50)
+    results["top_phrases:30"] = analytics.top_phrases(db_path, limit=30)
+
+    # Vocabulary (UI default)
+    results["vocabulary:month"] = analytics.vocabulary_size_trend(db_path, period="month")
+
+    # Response ratio + heatmap
+    results["response_ratio"] = analytics.response_ratio(db_path)
+    results["heatmap"] = analytics.time_of_day_heatmap(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        clear_cache(conn)
+        set_cached_many(conn, results)
+        conn.commit()
+    finally:
+        conn.close()
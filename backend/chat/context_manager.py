@@ -4,8 +4,15 @@ Context management for chat feature.
 Handles filtering and formatting vector search results for LLM context.
 """
 
+import heapq
+import unicodedata
 from typing import List, Dict, Any
 
+import numpy as np
+
+# Above this many candidates the NumPy path beats per-dict heap comparisons.
+_VECTORIZE_THRESHOLD = 64
+
 
 def filter_results_by_quality(
     results: List[Dict[str, Any]],
@@ -26,17 +33,40 @@ def filter_results_by_quality(
     if not results:
         return []
     
-    # Filter by minimum similarity
-    filtered = [
-        r for r in results 
-        if r.get("similarity", 0) >= min_similarity
-    ]
-    
-    # Sort by similarity (descending)
-    filtered.sort(key=lambda x: x.get("similarity", 0), reverse=True)
-    
-    # Limit to max_results
-    return filtered[:max_results]
+    if len(results) > _VECTORIZE_THRESHOLD:
+        return _top_results_numpy(results, min_similarity, max_results)
+
+    # Filter and take the top max_results in one pass: O(n log k), no
+    # intermediate filtered/sorted lists. Ties keep their original order.
+    def similarity(r):
+        return r.get("similarity", 0)
+
+    return heapq.nlargest(
+        max_results,
+        (r for r in results if similarity(r) >= min_similarity),
+        key=similarity,
+    )
+
+
+def _top_results_numpy(
+    results: List[Dict[str, Any]],
+    min_similarity: float,
+    max_results: int,
+) -> List[Dict[str, Any]]:
+    """filter_results_by_quality for large candidate lists, vectorized."""
+    if max_results <= 0:
+        return []
+    sims = np.fromiter(
+        (r.get("similarity", 0) for r in results), dtype=np.float64, count=len(results)
+    )
+    idx = np.flatnonzero(sims >= min_similarity)
+    if len(idx) > max_results:
+        # Keep everything that ties the k-th best score so the stable sort
+        # below picks the same results as a full sort would.
+        kth = np.partition(sims[idx], len(idx) - max_results)[len(idx) - max_results]
+        idx = idx[sims[idx] >= kth]
+    order = idx[np.argsort(-sims[idx], kind="stable")][:max_results]
+    return [results[i] for i in order]
 
 
 def format_context_for_llm(
@@ -57,10 +87,19 @@ def format_context_for_llm(
     if not results:
         return "No relevant context found."
     
+    # Pieces are joined once at the end; "\n" separates chunks (not counted
+    # against the budget, as before).
     parts = []
     total_length = 0
+    # Cap each chunk so one huge chunk doesn't crowd out the others.
+    # This is critical for good RAG behavior (multiple, diverse evidence snippets).
+    per_chunk_cap = max(200, int(max_chunk_chars))
     
     for i, result in enumerate(results, 1):
+        remaining = max_context_length - total_length
+        if remaining <= 0:
+            break
+
         content = result.get("content", "")
         similarity = result.get("similarity", 0.0)
         metadata = result.get("metadata", {})
@@ -72,31 +111,28 @@ def format_context_for_llm(
             f"Source: {title} (Chunk {chunk_idx})\n"
         )
 
-        remaining = max_context_length - total_length
-        if remaining <= 0:
-            break
-
         # Always try to include at least the header; truncate content to fit the remaining budget.
         # This prevents the "No relevant context found." false-negative when chunks are large.
         min_needed = len(header) + 2  # "\n\n" after content
         if remaining < min_needed:
             break
 
-        # Cap each chunk so one huge chunk doesn't crowd out the others.
-        # This is critical for good RAG behavior (multiple, diverse evidence snippets).
-        per_chunk_cap = max(200, int(max_chunk_chars))
-        max_content_len = min(per_chunk_cap, remaining - len(header) - 2)
+        max_content_len = min(per_chunk_cap, remaining - min_needed)
         safe_content = content or ""
         if len(safe_content) > max_content_len:
             # Reserve a small suffix for an ellipsis marker when truncating.
             if max_content_len > 30:
-                safe_content = safe_content[: max_content_len - 3].rstrip() + "..."
+                cut = max_content_len - 3
+                # Don't strip combining marks off the character they belong to.
+                while cut > 0 and unicodedata.category(safe_content[cut]).startswith("M"):
+                    cut -= 1
+                safe_content = safe_content[:cut].rstrip() + "..."
             else:
                 safe_content = safe_content[:max_content_len]
 
-        chunk_text = f"{header}{safe_content}\n\n"
-
-        parts.append(chunk_text)
-        total_length += len(chunk_text)
+        if parts:
+            parts.append("\n")
+        parts += (header, safe_content, "\n\n")
+        total_length += min_needed + len(safe_content)
     
-    return "\n".join(parts) if parts else "No relevant context found."
+    return "".join(parts) if parts else "No relevant context found."
@@ -4,6 +4,12 @@ History management for chat feature.
 Handles sliding window for conversation history.
 """
 
+import hashlib
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
 from typing import List, Dict, Any, Optional, Callable
 
 
@@ -18,6 +24,91 @@ def estimate_tokens(text: str) -> int:
     return len(text) // 4
 
 
+# cl100k_base is loaded off the request path: tiktoken may have to read or
+# download the BPE file. A failed load is retried after _BPE_RETRY_SECONDS.
+_BPE_RETRY_SECONDS = 5 * 60
+_bpe_encoding_value = None
+_bpe_failed_at: Optional[float] = None
+_bpe_loading = False
+_bpe_load_lock = threading.Lock()
+
+
+def _claim_bpe_load() -> bool:
+    global _bpe_loading
+    with _bpe_load_lock:
+        if _bpe_encoding_value is not None or _bpe_loading:
+            return False
+        if _bpe_failed_at is not None and time.monotonic() - _bpe_failed_at < _BPE_RETRY_SECONDS:
+            return False
+        _bpe_loading = True
+        return True
+
+
+def _load_bpe_encoding() -> None:
+    global _bpe_encoding_value, _bpe_failed_at, _bpe_loading
+    encoding = None
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        pass
+    with _bpe_load_lock:
+        _bpe_loading = False
+        if encoding is None:
+            _bpe_failed_at = time.monotonic()
+        else:
+            _bpe_encoding_value = encoding
+            _bpe_failed_at = None
+
+
+def load_bpe_encoding():
+    """Load the cl100k_base encoding now (blocking); returns it, or None if unavailable."""
+    if _claim_bpe_load():
+        _load_bpe_encoding()
+    return _bpe_encoding_value
+
+
+def start_bpe_encoding_load() -> None:
+    """Load the cl100k_base encoding in a background thread (call at startup)."""
+    if _claim_bpe_load():
+        threading.Thread(target=_load_bpe_encoding, name="bpe-encoding-load", daemon=True).start()
+
+
+# blake2b digest of a message -> its token count. Keyed by digest so the cache
+# holds 16 bytes per message instead of the message text.
+_BPE_CACHE_MAX_ENTRIES = 4096
+_bpe_counts: "OrderedDict[bytes, int]" = OrderedDict()
+_bpe_counts_lock = threading.Lock()
+
+
+def bpe_token_count(text: str) -> int:
+    """
+    Token count with tiktoken's cl100k_base encoding (falls back to
+    estimate_tokens until the encoding has loaded, or when tiktoken isn't
+    available). Never loads the encoding itself, so it is safe to call from
+    async handlers.
+    
+    Cached per message: the history is resent every turn, so each message is
+    encoded once per conversation rather than once per request.
+    """
+    encoding = _bpe_encoding_value
+    if encoding is None:
+        start_bpe_encoding_load()
+        return estimate_tokens(text)
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _bpe_counts_lock:
+        count = _bpe_counts.get(key)
+        if count is not None:
+            _bpe_counts.move_to_end(key)
+            return count
+    count = len(encoding.encode(text, disallowed_special=()))
+    with _bpe_counts_lock:
+        _bpe_counts[key] = count
+        while len(_bpe_counts) > _BPE_CACHE_MAX_ENTRIES:
+            _bpe_counts.popitem(last=False)
+    return count
+
+
 def apply_sliding_window(
     messages: List[Dict[str, str]],
     max_tokens: int = 4000,
@@ -51,19 +142,28 @@ def apply_sliding_window(
         messages = messages[1:]
     
     # Keep most recent messages that fit
-    window = []
-    total_tokens = 0
-    
-    # Process from most recent to oldest
-    for msg in reversed(messages):
-        content = msg.get("content", "")
-        tokens = token_estimator(content)
-        
-        if total_tokens + tokens > max_tokens:
-            break
+    if token_estimator is estimate_tokens:
+        # Default estimator: running totals from newest to oldest are
+        # non-decreasing, so the cutoff is a binary search.
+        recent_first = messages[::-1]
+        totals = list(accumulate(len(m.get("content", "")) // 4 for m in recent_first))
+        keep = bisect_right(totals, max_tokens)
+        window = recent_first[:keep][::-1]
+    else:
+        window = []
+        total_tokens = 0
         
-        window.insert(0, msg)
-        total_tokens += tokens
+        # Process from most recent to oldest
+        for msg in reversed(messages):
+            content = msg.get("content", "")
+            tokens = token_estimator(content)
+            
+            if total_tokens + tokens > max_tokens:
+                break
+            
+            window.append(msg)
+            total_tokens += tokens
+        window.reverse()
     
     # Re-add system message
     if system_msg:
@@ -4,10 +4,37 @@ Query improvement for better vector search results.
 Uses LLM to transform user queries into search-optimized queries.
 """
 
+import time
+from functools import lru_cache
 from typing import List, Dict, Optional
 from backend.llm.litellm_service import call_llm
 
 
+_SYSTEM_PROMPT = """You are a query improvement assistant. Your job is to transform user queries into concise, search-optimized queries for semantic search.
+
+Focus on:
+- Key concepts and entities
+- Core intent
+- Searchable terms
+
+Remove:
+- Conversational filler
+- Pronouns that need context
+- Vague references
+
+If the query is already clear and concise, return it as-is. Keep it short (under 20 words)."""
+
+
+# Improved queries are reused for at most this long (a bad or transient rewrite
+# shouldn't stick for the life of the process).
+QUERY_CACHE_TTL_SECONDS = 15 * 60
+
+
+def clear_query_cache() -> None:
+    """Forget all cached query improvements."""
+    _improve_query_cached.cache_clear()
+
+
 def format_history(history: List[Dict[str, str]], max_exchanges: int = 3) -> str:
     """Format conversation history for context."""
     if not history:
@@ -16,13 +43,7 @@ def format_history(history: List[Dict[str, str]], max_exchanges: int = 3) -> str
     # Get last N exchanges
     recent = history[-max_exchanges * 2:] if len(history) > max_exchanges * 2 else history
     
-    parts = []
-    for msg in recent:
-        role = msg.get("role", "unknown")
-        content = msg.get("content", "")
-        parts.append(f"{role}: {content}")
-    
-    return "\n".join(parts)
+    return "\n".join(f"{msg.get('role', 'unknown')}: {msg.get('content', '')}" for msg in recent)
 
 
 def improve_query_for_search(
@@ -47,44 +68,41 @@ def improve_query_for_search(
     Returns:
         Improved query string (falls back to original on error)
     """
-    system_prompt = """You are a query improvement assistant. Your job is to transform user queries into concise, search-optimized queries for semantic search.
-
-Focus on:
-- Key concepts and entities
-- Core intent
-- Searchable terms
-
-Remove:
-- Conversational filler
-- Pronouns that need context
-- Vague references
-
-If the query is already clear and concise, return it as-is. Keep it short (under 20 words)."""
-
     # Include recent history for context
     context = ""
     if conversation_history:
         recent = format_history(conversation_history, max_exchanges=3)
         context = f"\n\nRecent conversation:\n{recent}"
     
+    try:
+        ttl_bucket = int(time.monotonic() // QUERY_CACHE_TTL_SECONDS)
+        return _improve_query_cached(user_query, model, context, ttl_bucket)
+    except Exception:
+        # On any error, return original query
+        return user_query
+
+
+@lru_cache(maxsize=256)
+def _improve_query_cached(user_query: str, model: str, context: str, ttl_bucket: int) -> str:
+    """
+    One LLM call per distinct (query, model, recent history) per TTL window
+    (`ttl_bucket` changes every QUERY_CACHE_TTL_SECONDS, expiring old entries).
+    
+    Raises instead of returning a fallback so failed calls are not cached.
+    """
     prompt = f"""User query: {user_query}{context}
 
 Provide an improved search query:"""
 
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": _SYSTEM_PROMPT},
         {"role": "user", "content": prompt}
     ]
     
-    try:
-        improved = call_llm(messages, model, temperature=0.3, max_tokens=100)
-        improved = improved.strip()
-        
-        # Fallback to original if empty or error-like
-        if not improved or improved.startswith("Error"):
-            return user_query
-        
-        return improved
-    except Exception:
-        # On any error, return original query
-        return user_query
+    improved = call_llm(messages, model, temperature=0.3, max_tokens=100).strip()
+    
+    # Fallback to original if empty or error-like
+    if not improved or improved.startswith("Error"):
+        raise ValueError("query improvement returned no usable query")
+    
+    return improved
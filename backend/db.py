@@ -39,22 +39,65 @@ def get_jobs_db_path() -> Path:
     return get_data_dir() / "jobs.db"
 
 
+# Databases already switched to WAL in this process. journal_mode=WAL is stored
+# in the database file itself, so it only needs to be set once per file.
+_WAL_READY = set()
+
+
+def _tune_connection(conn: sqlite3.Connection, db_path: str) -> None:
+    """
+    WAL lets readers run alongside a writer, and synchronous=NORMAL (safe in
+    WAL mode) fsyncs at checkpoints instead of on every commit.
+    """
+    if db_path not in _WAL_READY:
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            _WAL_READY.add(db_path)
+        except sqlite3.OperationalError:
+            pass  # another connection holds a lock; try again on the next connect
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
 def get_db_connection(timeout: float = 30.0):
     """Get a database connection for conversations/messages."""
-    db_path = get_db_path()
-    conn = sqlite3.connect(str(db_path), timeout=timeout)
+    db_path = str(get_db_path())
+    conn = sqlite3.connect(db_path, timeout=timeout)
     conn.row_factory = sqlite3.Row
+    _tune_connection(conn, db_path)
     return conn
 
 
 def get_jobs_connection(timeout: float = 30.0):
     """Get a connection to the jobs database (separate file to avoid lock contention)."""
-    db_path = get_jobs_db_path()
-    conn = sqlite3.connect(str(db_path), timeout=timeout)
+    db_path = str(get_jobs_db_path())
+    conn = sqlite3.connect(db_path, timeout=timeout)
     conn.row_factory = sqlite3.Row
+    _tune_connection(conn, db_path)
     return conn
 
 
+_SUMMARY_READY = set()
+
+
+def ensure_conversation_summary(conn) -> bool:
+    """
+    Make sure the `conversation_summary` table (and its triggers) exist.
+
+    Checked once per process and database: databases initialized before the
+    table existed get it (backfilled) on first use. Returns False when the
+    database doesn't have the source tables yet.
+    """
+    db_path = str(get_db_path())
+    if db_path in _SUMMARY_READY:
+        return True
+    from database import create_conversation_summary_tables
+    if not create_conversation_summary_tables.ensure_conversation_summary(conn):
+        return False
+    _SUMMARY_READY.add(db_path)
+    return True
+
+
 def check_database_initialized() -> bool:
     """Check if database is initialized by looking for conversations table."""
     try:
@@ -85,6 +128,7 @@ def initialize_database():
         create_import_report_tables,
         create_entity_keyword_tables,
         create_analytics_cache_tables,
+        create_conversation_summary_tables,
     )
     
     db_path = get_db_path()
@@ -100,6 +144,8 @@ def initialize_database():
     create_import_report_tables.create_import_report_tables(str(db_path))
     create_entity_keyword_tables.create_entity_keyword_tables(str(db_path))
     create_analytics_cache_tables.create_analytics_cache_tables(str(db_path))
+    # Derived from the tables above; must run after them.
+    create_conversation_summary_tables.create_conversation_summary_tables(str(db_path))
     
     return True
 
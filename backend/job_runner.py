@@ -28,6 +28,12 @@ def cancel_all_vectordb_jobs() -> None:
         for event in _vectordb_cancel_events.values():
             event.set()
 
+
+def vectordb_jobs_running() -> int:
+    """Number of vectordb index jobs that haven't finished (or noticed a cancel) yet."""
+    with _vectordb_cancel_lock:
+        return len(_vectordb_cancel_events)
+
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -253,6 +259,18 @@ async def run_import_job(job_id: str, metadata: dict):
             # TODO: Implement FTS5 population
             # For now, just mark as done
         
+        if not import_result.get("skipped_duplicate"):
+            # New messages: drop stale analytics now, then recompute them once
+            # so the dashboard's first load is served from the cache.
+            from backend.analytics_cache import invalidate_cache, precompute_analytics
+            invalidate_cache(str(db_path))
+            update_job(job_id, progress=90, message="Updating analytics...")
+            try:
+                await loop.run_in_executor(None, precompute_analytics, str(db_path))
+            except Exception as e:
+                # Analytics are recomputed on demand; don't fail the import.
+                print(f"Analytics precompute failed: {e}")
+
         if import_result.get("skipped_duplicate"):
             final_msg = "Import completed: no new conversations (already in database)."
         else:
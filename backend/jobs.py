@@ -1,9 +1,11 @@
 """
 Job system with SQLite persistence.
 """
+import asyncio
 import sqlite3
 import uuid
 import json
+import threading
 from datetime import datetime
 from typing import Dict, Optional, List
 from enum import Enum
@@ -26,6 +28,83 @@ class JobType(str, Enum):
     VECTORDB_INDEX = "vectordb_index"
 
 
+# Bumped on every job write. Readers (the SSE stream, ETags, the list cache)
+# compare versions instead of re-reading the jobs table on every poll.
+_jobs_version = 0
+_jobs_lock = threading.Lock()
+_list_cache = None  # (version, limit, rows)
+
+# (loop, asyncio.Event) of every coroutine in wait_for_jobs_change_async, set
+# thread-safely by whichever thread changes a job. Streams stop once
+# _streams_closed is set.
+_async_waiters = set()
+_streams_closed = False
+
+
+def _wake_async_waiters():
+    for loop, event in list(_async_waiters):
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # loop already closed
+
+
+def _notify_jobs_changed():
+    global _jobs_version
+    with _jobs_lock:
+        _jobs_version += 1
+        _wake_async_waiters()
+
+
+# The version counter restarts at 0 with the process; ETags also carry this
+# per-process token so a tag from a previous run never matches.
+_BOOT_ID = uuid.uuid4().hex[:12]
+
+
+def jobs_version() -> int:
+    """Current job-state version (changes whenever any job is created or updated)."""
+    return _jobs_version
+
+
+def jobs_etag() -> str:
+    """Weak ETag for the job list, unique across server restarts."""
+    return f'W/"jobs-{_BOOT_ID}-{_jobs_version}"'
+
+
+async def wait_for_jobs_change_async(since: int, timeout: float) -> int:
+    """
+    Wait until the job version differs from `since`, `timeout` elapses or job
+    streams are closed; return the version. Waits on the event loop, so no
+    executor thread is held per waiting client.
+    """
+    event = asyncio.Event()
+    waiter = (asyncio.get_running_loop(), event)
+    with _jobs_lock:
+        if _jobs_version != since or _streams_closed:
+            return _jobs_version
+        _async_waiters.add(waiter)
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        with _jobs_lock:
+            _async_waiters.discard(waiter)
+    return _jobs_version
+
+
+def close_job_streams() -> None:
+    """End every open job stream (called on shutdown so the server can drain)."""
+    global _streams_closed
+    with _jobs_lock:
+        _streams_closed = True
+        _wake_async_waiters()
+
+
+def job_streams_closed() -> bool:
+    return _streams_closed
+
+
 def init_jobs_table():
     """Create jobs table if it doesn't exist."""
     conn = get_jobs_connection()
@@ -61,6 +140,7 @@ def create_job(job_type: str, metadata: Optional[Dict] = None) -> str:
     """, (job_id, job_type, JobStatus.PENDING.value, json.dumps(metadata) if metadata else None))
     conn.commit()
     conn.close()
+    _notify_jobs_changed()
     
     return job_id
 
@@ -107,6 +187,18 @@ def update_job(job_id: str, status: Optional[str] = None, progress: Optional[int
         conn.commit()
     
     conn.close()
+    if updates:
+        _notify_jobs_changed()
+
+
+def _row_to_job(row) -> Dict:
+    """Build a fresh job dict (with decoded result/metadata) from a jobs row."""
+    job = dict(row)
+    if job.get('result_json'):
+        job['result'] = json.loads(job['result_json'])
+    if job.get('metadata_json'):
+        job['metadata'] = json.loads(job['metadata_json'])
+    return job
 
 
 def get_job(job_id: str) -> Optional[Dict]:
@@ -119,36 +211,28 @@ def get_job(job_id: str) -> Optional[Dict]:
     if not row:
         return None
     
-    job = dict(row)
-    if job.get('result_json'):
-        job['result'] = json.loads(job['result_json'])
-    if job.get('metadata_json'):
-        job['metadata'] = json.loads(job['metadata_json'])
-    
-    return job
+    return _row_to_job(row)
 
 
 def list_jobs(limit: int = 50) -> List[Dict]:
-    """List recent jobs."""
-    init_jobs_table()
-    conn = get_jobs_connection()
-    cursor = conn.execute("""
-        SELECT * FROM jobs
-        ORDER BY created_at DESC
-        LIMIT ?
-    """, (limit,))
-    
-    jobs = []
-    for row in cursor.fetchall():
-        job = dict(row)
-        if job.get('result_json'):
-            job['result'] = json.loads(job['result_json'])
-        if job.get('metadata_json'):
-            job['metadata'] = json.loads(job['metadata_json'])
-        jobs.append(job)
-    
-    conn.close()
-    return jobs
+    """List recent jobs (rows served from memory until a job changes)."""
+    global _list_cache
+    version = _jobs_version
+    if _list_cache is None or _list_cache[:2] != (version, limit):
+        init_jobs_table()
+        conn = get_jobs_connection()
+        cursor = conn.execute("""
+            SELECT * FROM jobs
+            ORDER BY created_at DESC
+            LIMIT ?
+        """, (limit,))
+        # Only immutable column values are cached; every call builds its own
+        # dicts, so a caller modifying a job can't corrupt later reads.
+        rows = [tuple(dict(row).items()) for row in cursor.fetchall()]
+        conn.close()
+        _list_cache = (version, limit, rows)
+    
+    return [_row_to_job(row) for row in _list_cache[2]]
 
 
 def cancel_job(job_id: str) -> bool:
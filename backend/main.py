@@ -1,10 +1,10 @@
 """
 FastAPI backend for Lode.
 """
-from fastapi import FastAPI, HTTPException, Query, Path as PathParam, Request, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Query, Path as PathParam, Request, Response, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse
 from jinja2 import Environment, FileSystemLoader
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
@@ -15,7 +15,9 @@ import os
 import sqlite3
 import uuid
 import re
+import json
 import io
+import asyncio
 
 from lode_version import __version__ as LODE_VERSION
 
@@ -26,8 +28,8 @@ sys.path.insert(0, str(parent_dir))
 # Also add current directory for table creation scripts
 sys.path.insert(0, str(parent_dir))
 
-from backend.db import check_database_initialized, initialize_database, get_db_connection, get_data_dir
-from backend.jobs import create_job, get_job, list_jobs, cancel_job, JobType, JobStatus
+from backend.db import check_database_initialized, initialize_database, get_db_connection, get_data_dir, ensure_conversation_summary
+from backend.jobs import create_job, get_job, list_jobs, cancel_job, JobType, JobStatus, jobs_version, jobs_etag, wait_for_jobs_change_async, job_streams_closed
 from backend.routes import organization
 from backend.routes import vectordb
 from backend.feature_flags import is_feature_enabled
@@ -88,6 +90,14 @@ from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Load the chat token encoding in the background, off the request path
+    try:
+        from backend.feature_flags import is_feature_enabled
+        if is_feature_enabled('chat'):
+            from backend.chat.history_manager import start_bpe_encoding_load
+            start_bpe_encoding_load()
+    except Exception:
+        pass
     yield
     # On shutdown: signal running vectordb index jobs to stop so the process can exit
     try:
@@ -95,6 +105,12 @@ async def lifespan(app: FastAPI):
         cancel_all_vectordb_jobs()
     except Exception:
         pass
+    # Release the analytics module's pooled SQLite connections
+    try:
+        import analytics
+        analytics.close_connections()
+    except Exception:
+        pass
 
 
 def render_template(template_name: str, **context):
@@ -191,9 +207,15 @@ class StateRequest(BaseModel):
 
 # Core endpoints
 @app.get("/api/health", response_model=HealthResponse)
-async def health():
+async def health(response: Response):
+    response.headers["X-Lode"] = "1"
     return HealthResponse(status="ok")
 
+@app.head("/api/health")
+async def health_head():
+    """Header-only liveness probe (the desktop launcher checks X-Lode, no body to parse)."""
+    return Response(headers={"X-Lode": "1"})
+
 @app.get("/api/setup/check", response_model=SetupCheckResponse)
 async def setup_check():
     return SetupCheckResponse(initialized=check_database_initialized())
@@ -355,9 +377,18 @@ async def list_conversations(
     starred: Optional[str] = Query(None),
     ai_source: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    after_time: Optional[float] = Query(None),
+    after_id: Optional[str] = Query(None)
 ):
-    """List conversations with filtering and sorting. Returns HTML fragment if HTMX request."""
+    """
+    List conversations with filtering and sorting. Returns HTML fragment if HTMX request.
+
+    For the time sorts, `after_time`/`after_id` (the sort value and id of the
+    last row already shown) page by keyset instead of OFFSET, so deep pages
+    don't rescan every earlier row. `after_time` is omitted once the cursor is
+    in the trailing rows whose time is NULL.
+    """
     if not check_database_initialized():
         if request.headers.get("HX-Request"):
             return HTMLResponse(render_template("fragments/conversation_list.html", conversations=[]))
@@ -366,6 +397,38 @@ async def list_conversations(
     conn = get_db_connection()
     conn.row_factory = sqlite3.Row
     
+    # One row per conversation in `conversation_summary` (kept current by
+    # triggers); fall back to joining the source tables if it can't exist yet.
+    if ensure_conversation_summary(conn):
+        select_from = """
+            SELECT 
+                c.conversation_id,
+                c.title,
+                c.create_time,
+                c.update_time,
+                c.ai_source,
+                c.is_starred,
+                c.message_count,
+                c.word_count,
+                c.tags_json
+            FROM conversation_summary c
+        """
+    else:
+        select_from = """
+            SELECT 
+                c.conversation_id,
+                c.title,
+                c.create_time,
+                c.update_time,
+                c.ai_source,
+                c.is_starred,
+                COALESCE(s.message_count_total, 0) as message_count,
+                COALESCE(s.word_count_total, 0) as word_count,
+                NULL as tags_json
+            FROM conversations c
+            LEFT JOIN conversation_stats s ON s.conversation_id = c.conversation_id
+        """
+    
     # Use FTS5 search if query provided, otherwise regular query
     if q:
         # Check if FTS5 tables exist and use them
@@ -420,20 +483,7 @@ async def list_conversations(
             
             # Build query for those conversation IDs and apply other filters
             placeholders = ','.join('?' * len(conv_ids))
-            query = f"""
-                SELECT 
-                    c.conversation_id,
-                    c.title,
-                    c.create_time,
-                    c.update_time,
-                    c.ai_source,
-                    c.is_starred,
-                    COALESCE(s.message_count_total, 0) as message_count,
-                    COALESCE(s.word_count_total, 0) as word_count
-                FROM conversations c
-                LEFT JOIN conversation_stats s ON s.conversation_id = c.conversation_id
-                WHERE c.conversation_id IN ({placeholders})
-            """
+            query = select_from + f" WHERE c.conversation_id IN ({placeholders})"
             params = list(conv_ids)
             
             # Apply additional filters
@@ -465,38 +515,12 @@ async def list_conversations(
         except Exception as e:
             # Fallback to title search if FTS5 fails
             print(f"FTS5 search error: {e}, falling back to title search")
-            query = """
-                SELECT 
-                    c.conversation_id,
-                    c.title,
-                    c.create_time,
-                    c.update_time,
-                    c.ai_source,
-                    c.is_starred,
-                    COALESCE(s.message_count_total, 0) as message_count,
-                    COALESCE(s.word_count_total, 0) as word_count
-                FROM conversations c
-                LEFT JOIN conversation_stats s ON s.conversation_id = c.conversation_id
-                WHERE 1=1
-            """
+            query = select_from + " WHERE 1=1"
             params = []
             query += " AND c.title LIKE ?"
             params.append(f"%{q}%")
     else:
-        query = """
-            SELECT 
-                c.conversation_id,
-                c.title,
-                c.create_time,
-                c.update_time,
-                c.ai_source,
-                c.is_starred,
-                COALESCE(s.message_count_total, 0) as message_count,
-                COALESCE(s.word_count_total, 0) as word_count
-            FROM conversations c
-            LEFT JOIN conversation_stats s ON s.conversation_id = c.conversation_id
-            WHERE 1=1
-        """
+        query = select_from + " WHERE 1=1"
         params = []
     
     if tag:
@@ -528,34 +552,75 @@ async def list_conversations(
     # Calculate total count (same WHERE conditions, no LIMIT/OFFSET/ORDER BY)
     # Build count query by extracting FROM and WHERE parts
     from_where = query.split("FROM", 1)[1].split("ORDER BY")[0] if "ORDER BY" in query else query.split("FROM", 1)[1]
+    # The stats join is a LEFT JOIN on a unique key: it can't change the count.
+    from_where = from_where.replace("LEFT JOIN conversation_stats s ON s.conversation_id = c.conversation_id", "")
     count_query = "SELECT COUNT(*) as total FROM" + from_where
     count_cursor = conn.execute(count_query, params)
     total_count = count_cursor.fetchone()['total']
     
+    # conversation_id breaks ties so pages never overlap or skip rows.
     sort_map = {
-        "update_time": "c.update_time DESC NULLS LAST",
-        "create_time": "c.create_time ASC NULLS LAST",
-        "message_count": "s.message_count_total DESC NULLS LAST",
-        "word_count": "s.word_count_total DESC NULLS LAST"
+        "update_time": "c.update_time DESC NULLS LAST, c.conversation_id DESC",
+        "create_time": "c.create_time ASC NULLS LAST, c.conversation_id ASC",
+        "message_count": "message_count DESC, c.conversation_id DESC",
+        "word_count": "word_count DESC, c.conversation_id DESC"
     }
+    # Keyset pagination for the time sorts: (column, comparison in sort order).
+    keyset_map = {
+        "update_time": ("c.update_time", "<"),
+        "create_time": ("c.create_time", ">"),
+    }
+    if sort not in sort_map:
+        sort = "update_time"
+    keyset = keyset_map.get(sort) if not q and after_id is not None else None
+    order_by = f" ORDER BY {sort_map[sort]}"
     
-    # Apply sorting and pagination
-    query += f" ORDER BY {sort_map.get(sort, 'c.update_time DESC NULLS LAST')}"
-    query += " LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
+    if keyset:
+        # Each branch is a single index range; rows with a NULL time sort last.
+        column, op = keyset
+        if after_time is not None:
+            rows = conn.execute(
+                query + f" AND ({column}, c.conversation_id) {op} (?, ?)" + order_by + " LIMIT ?",
+                params + [after_time, after_id, limit]
+            ).fetchall()
+            if len(rows) < limit:
+                rows += conn.execute(
+                    query + f" AND {column} IS NULL" + order_by + " LIMIT ?",
+                    params + [limit - len(rows)]
+                ).fetchall()
+        else:
+            rows = conn.execute(
+                query + f" AND {column} IS NULL AND c.conversation_id {op} ?" + order_by + " LIMIT ?",
+                params + [after_id, limit]
+            ).fetchall()
+    else:
+        # Apply sorting and pagination
+        query += order_by + " LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        
+        cursor = conn.execute(query, params)
+        rows = cursor.fetchall()
     
-    cursor = conn.execute(query, params)
-    rows = cursor.fetchall()
+    # Tags come with the summary rows; otherwise fetch them for the whole page
+    # in one query (not one query per conversation)
+    tags_by_conv = {}
+    if rows and rows[0]['tags_json'] is not None:
+        tags_by_conv = {row['conversation_id']: json.loads(row['tags_json']) for row in rows}
+    elif rows:
+        page_ids = [row['conversation_id'] for row in rows]
+        tag_cursor = conn.execute(f"""
+            SELECT ct.conversation_id, json_group_array(t.name) as tags_json
+            FROM conversation_tags ct
+            JOIN tags t ON t.tag_id = ct.tag_id
+            WHERE ct.conversation_id IN ({','.join('?' * len(page_ids))})
+            GROUP BY ct.conversation_id
+        """, page_ids)
+        tags_by_conv = {r['conversation_id']: json.loads(r['tags_json']) for r in tag_cursor}
     
     results = []
     for row in rows:
         conv_id = row['conversation_id']
-        tag_cursor = conn.execute("""
-            SELECT t.name FROM tags t
-            JOIN conversation_tags ct ON ct.tag_id = t.tag_id
-            WHERE ct.conversation_id = ?
-        """, (conv_id,))
-        tags = [r[0] for r in tag_cursor.fetchall()]
+        tags = tags_by_conv.get(conv_id, [])
         
         results.append({
             "conversation_id": conv_id,
@@ -572,34 +637,44 @@ async def list_conversations(
     conn.close()
     
     if request.headers.get("HX-Request"):
+        next_cursor = None
+        if sort in keyset_map and not q and len(results) == limit:
+            last = results[-1]
+            time_key = "update_time" if sort == "update_time" else "create_time"
+            next_cursor = {"after_time": last[time_key], "after_id": last["conversation_id"]}
         return HTMLResponse(render_template(
             "fragments/conversation_list.html", 
             conversations=results,
             total_count=total_count,
             offset=offset,
             limit=limit,
-            has_more=(offset + limit < total_count)
+            has_more=(len(results) == limit) if keyset else (offset + limit < total_count),
+            next_cursor=next_cursor
         ))
-    return results
+    # Plain JSON types already: skip FastAPI's jsonable_encoder pass.
+    return JSONResponse(results)
 
 @app.get("/api/conversations/{conversation_id}")
 async def get_conversation(request: Request, conversation_id: str = PathParam(...)):
     """Get conversation details. Returns HTML fragment if HTMX request."""
     conn = get_db_connection()
     conn.row_factory = sqlite3.Row
-    cursor = conn.execute("SELECT * FROM conversations WHERE conversation_id = ?", (conversation_id,))
+    cursor = conn.execute("""
+        SELECT c.*, (
+            SELECT json_group_array(t.name) FROM tags t
+            JOIN conversation_tags ct ON ct.tag_id = t.tag_id
+            WHERE ct.conversation_id = c.conversation_id
+        ) as tags_json
+        FROM conversations c
+        WHERE c.conversation_id = ?
+    """, (conversation_id,))
     row = cursor.fetchone()
     
     if not row:
         conn.close()
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    tag_cursor = conn.execute("""
-        SELECT t.name FROM tags t
-        JOIN conversation_tags ct ON ct.tag_id = t.tag_id
-        WHERE ct.conversation_id = ?
-    """, (conversation_id,))
-    tags = [r[0] for r in tag_cursor.fetchall()]
+    tags = json.loads(row['tags_json'])
     
     stats_cursor = conn.execute("SELECT * FROM conversation_stats WHERE conversation_id = ?", (conversation_id,))
     stats_row = stats_cursor.fetchone()
@@ -619,7 +694,7 @@ async def get_conversation(request: Request, conversation_id: str = PathParam(..
     
     if request.headers.get("HX-Request"):
         return HTMLResponse(render_template("fragments/conversation_details.html", conversation=result))
-    return result
+    return JSONResponse(result)
 
 @app.get("/api/conversations/{conversation_id}/messages")
 async def get_messages(
@@ -979,10 +1054,47 @@ async def create_vectordb_index_job(request: VectordbIndexRequest = VectordbInde
     return JobResponse(job_id=job_id)
 
 @app.get("/api/jobs", response_model=List[JobStatusResponse])
-async def list_jobs_endpoint():
-    """List all jobs."""
+async def list_jobs_endpoint(request: Request):
+    """List all jobs. Supports If-None-Match so pollers get 304 until a job changes."""
+    etag = jobs_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
     jobs = list_jobs()
-    return [JobStatusResponse(**job) for job in jobs]
+    payload = [JobStatusResponse(**job).model_dump(mode="json") for job in jobs]
+    return JSONResponse(payload, headers={"ETag": etag})
+
+@app.get("/api/jobs/stream")
+async def stream_jobs(request: Request):
+    """
+    Server-Sent Events feed of the job list.
+
+    Sends the list on connect and again after each job change, instead of the
+    client polling /api/jobs, with a keepalive comment after 5s of inactivity.
+    Waiting happens on the event loop and the job list is read in the thread
+    pool; the stream ends on disconnect or when shutdown calls
+    close_job_streams().
+    """
+    def jobs_payload():
+        return json.dumps([JobStatusResponse(**job).model_dump(mode="json") for job in list_jobs()])
+
+    async def events():
+        loop = asyncio.get_event_loop()
+        version = None
+        while not job_streams_closed() and not await request.is_disconnected():
+            current = jobs_version()
+            if current != version:
+                version = current
+                payload = await loop.run_in_executor(None, jobs_payload)
+                yield f"data: {payload}\n\n"
+            else:
+                yield ": keepalive\n\n"
+            await wait_for_jobs_change_async(version, 5.0)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 @app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
 async def get_job_endpoint(job_id: str = PathParam(...)):
@@ -1059,36 +1171,10 @@ async def refresh_analytics():
         return {"status": "not_initialized"}
 
     try:
-        import analytics
         from backend.db import get_db_path
-        from backend.analytics_cache import clear_cache, set_cached
-
-        db_path = str(get_db_path())
-        conn = sqlite3.connect(db_path)
-
-        clear_cache(conn)
+        from backend.analytics_cache import precompute_analytics
 
-        # Usage: day/week/month (no explicit range)
-        for p in ("day", "week", "month"):
-            set_cached(conn, f"usage:{p}", analytics.usage_over_time(db_path=db_path, period=p))
-
-        # Streaks
-        set_cached(conn, "streaks", analytics.longest_streak(db_path))
-
-        # Top words/phrases (UI defaults)
-        # Note: bump cache key when filtering behavior changes.
-        set_cached(conn, "top_words_v3:50", analytics.top_words(db_path, limit=50))
-        set_cached(conn, "top_phrases:30", analytics.top_phrases(db_path, limit=30))
-
-        # Vocabulary (UI default)
-        set_cached(conn, "vocabulary:month", analytics.vocabulary_size_trend(db_path, period="month"))
-
-        # Response ratio + heatmap
-        set_cached(conn, "response_ratio", analytics.response_ratio(db_path))
-        set_cached(conn, "heatmap", analytics.time_of_day_heatmap(db_path))
-
-        conn.commit()
-        conn.close()
+        precompute_analytics(str(get_db_path()))
         return {"status": "ok"}
     except Exception as e:
         print(f"Analytics refresh error: {e}")
@@ -12,9 +12,9 @@ import queue
 
 from backend.feature_flags import is_feature_enabled
 from backend.llm.litellm_service import call_llm, call_llm_stream, get_available_providers
-from backend.chat.query_improver import improve_query_for_search
+from backend.chat.query_improver import improve_query_for_search, clear_query_cache
 from backend.chat.context_manager import filter_results_by_quality, format_context_for_llm
-from backend.chat.history_manager import apply_sliding_window
+from backend.chat.history_manager import apply_sliding_window, bpe_token_count
 from backend.vectordb.service import search_phrases
 from backend.db import check_database_initialized, get_db_connection
 from backend.chat import storage as chat_storage
@@ -121,7 +121,9 @@ async def chat_completion(request: ChatRequest) -> ChatResponse:
         history = [{"role": msg.role, "content": msg.content} for msg in request.history]
 
         # Use a windowed subset for query improvement (keeps it relevant + bounded)
-        history_for_improvement = apply_sliding_window(history, max_tokens=min(800, request.context_window_size))
+        history_for_improvement = apply_sliding_window(
+            history, max_tokens=min(800, request.context_window_size), token_estimator=bpe_token_count
+        )
         
         # 1. Improve query
         improved_query = improve_query_for_search(
@@ -153,7 +155,8 @@ async def chat_completion(request: ChatRequest) -> ChatResponse:
         # 5. Apply sliding window to history
         windowed_history = apply_sliding_window(
             history,
-            request.context_window_size
+            request.context_window_size,
+            token_estimator=bpe_token_count,
         )
         
         # 6. Build messages for LLM
@@ -266,7 +269,9 @@ async def chat_completion_stream(request: ChatRequest):
     async def gen():
         try:
             history = [{"role": msg.role, "content": msg.content} for msg in request.history]
-            history_for_improvement = apply_sliding_window(history, max_tokens=min(800, request.context_window_size))
+            history_for_improvement = apply_sliding_window(
+                history, max_tokens=min(800, request.context_window_size), token_estimator=bpe_token_count
+            )
             improved_query = improve_query_for_search(request.query, request.model, history_for_improvement)
             search_results = await search_vectordb([improved_query, request.query], request.max_context_chunks)
             filtered = filter_results_by_quality(search_results, request.min_similarity, request.max_context_chunks)
@@ -300,7 +305,7 @@ async def chat_completion_stream(request: ChatRequest):
                 meta["sources_preview"] = sources[: min(len(sources or []), 5)] if sources else []
             yield f"data: {json.dumps(meta)}\n\n"
 
-            windowed_history = apply_sliding_window(history, request.context_window_size)
+            windowed_history = apply_sliding_window(history, request.context_window_size, token_estimator=bpe_token_count)
 
             if len(filtered) > 0:
                 system_prompt = (
@@ -566,6 +571,7 @@ async def clear_history():
         conn = get_db_connection()
         chat_storage.clear_chat_history(conn)
         conn.close()
+        clear_query_cache()
         return {"status": "cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to clear chat history: {str(e)}")
@@ -128,9 +128,9 @@ def calculate_conversation_stats(conn: sqlite3.Connection, conversation_id: str)
         stats['last_message_time'] = max(stats['timestamps'])
         stats['duration_seconds'] = stats['last_message_time'] - stats['first_message_time']
         
-        # Count distinct days
+        # Count distinct (local) days, converting each distinct timestamp once.
         days = set()
-        for ts in stats['timestamps']:
+        for ts in set(stats['timestamps']):
             try:
                 dt = datetime.fromtimestamp(ts)
                 days.add(dt.date())
@@ -0,0 +1,149 @@
+"""
+Create the denormalized conversation_summary table used by the conversation list.
+
+Goal:
+- One row per conversation with everything the list shows (title, times,
+  stats, custom title, tags), so a page is a single indexed table read
+  instead of a join across conversations/conversation_stats/custom_titles/tags.
+- Triggers on the source tables keep it current; nothing else writes to it.
+"""
+
+import sqlite3
+
+# Tables the summary is derived from; triggers need all of them to exist.
+SOURCE_TABLES = ("conversations", "conversation_stats", "custom_titles", "conversation_tags", "tags")
+
+# Recompute the summary rows of the conversations matched by {where}.
+# Delete + plain INSERT rather than INSERT OR REPLACE: inside a trigger, an
+# outer statement's OR IGNORE would override REPLACE and leave the row stale.
+_REFRESH_SQL = """
+    DELETE FROM conversation_summary
+    WHERE conversation_id IN (SELECT c.conversation_id FROM conversations c WHERE {where});
+    INSERT INTO conversation_summary (
+        conversation_id, title, create_time, update_time, ai_source, is_starred,
+        message_count, word_count, custom_title, tags_json
+    )
+    SELECT
+        c.conversation_id,
+        c.title,
+        c.create_time,
+        c.update_time,
+        c.ai_source,
+        COALESCE(c.is_starred, 0),
+        COALESCE(s.message_count_total, 0),
+        COALESCE(s.word_count_total, 0),
+        ct.custom_title,
+        (
+            SELECT json_group_array(t.name)
+            FROM conversation_tags xt
+            JOIN tags t ON t.tag_id = xt.tag_id
+            WHERE xt.conversation_id = c.conversation_id
+        )
+    FROM conversations c
+    LEFT JOIN conversation_stats s ON s.conversation_id = c.conversation_id
+    LEFT JOIN custom_titles ct ON ct.conversation_id = c.conversation_id
+    WHERE {where}
+"""
+
+
+def _refresh(where: str) -> str:
+    return _REFRESH_SQL.format(where=where).strip() + ";"
+
+
+def _triggers():
+    """(name, table, event, body) for every trigger that maintains the summary."""
+    by_id = "c.conversation_id = {row}.conversation_id"
+    by_tag = "c.conversation_id IN (SELECT conversation_id FROM conversation_tags WHERE tag_id = {row}.tag_id)"
+
+    yield ("trg_conversation_summary_conv_insert", "conversations", "AFTER INSERT",
+           _refresh(by_id.format(row="NEW")))
+    yield ("trg_conversation_summary_conv_update", "conversations", "AFTER UPDATE",
+           "DELETE FROM conversation_summary WHERE conversation_id = OLD.conversation_id;\n"
+           + _refresh(by_id.format(row="NEW")))
+    yield ("trg_conversation_summary_conv_delete", "conversations", "AFTER DELETE",
+           "DELETE FROM conversation_summary WHERE conversation_id = OLD.conversation_id;")
+
+    for table in ("conversation_stats", "custom_titles", "conversation_tags"):
+        yield (f"trg_conversation_summary_{table}_insert", table, "AFTER INSERT",
+               _refresh(by_id.format(row="NEW")))
+        yield (f"trg_conversation_summary_{table}_update", table, "AFTER UPDATE",
+               _refresh(by_id.format(row="OLD")) + "\n" + _refresh(by_id.format(row="NEW")))
+        yield (f"trg_conversation_summary_{table}_delete", table, "AFTER DELETE",
+               _refresh(by_id.format(row="OLD")))
+
+    # Renaming or deleting a tag changes the tag list of every conversation using it.
+    yield ("trg_conversation_summary_tags_update", "tags", "AFTER UPDATE OF name",
+           _refresh(by_tag.format(row="NEW")))
+    yield ("trg_conversation_summary_tags_delete", "tags", "AFTER DELETE",
+           _refresh(by_tag.format(row="OLD")))
+
+
+def ensure_conversation_summary(conn: sqlite3.Connection) -> bool:
+    """
+    Create the summary table, its indexes and triggers if missing, and backfill
+    it when it is new. Returns False (and creates nothing) when one of the
+    source tables doesn't exist yet.
+    """
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+    }
+    if not all(table in existing for table in SOURCE_TABLES):
+        return False
+
+    created = "conversation_summary" not in existing
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS conversation_summary (
+            conversation_id TEXT PRIMARY KEY,
+            title TEXT,
+            create_time REAL,
+            update_time REAL,
+            ai_source TEXT,
+            is_starred INTEGER NOT NULL DEFAULT 0,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            word_count INTEGER NOT NULL DEFAULT 0,
+            custom_title TEXT,
+            tags_json TEXT NOT NULL DEFAULT '[]'
+        ) WITHOUT ROWID
+        """
+    )
+
+    # One index per list sort order (conversation_id breaks ties).
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_conversation_summary_update_time "
+        "ON conversation_summary(update_time DESC, conversation_id DESC)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_conversation_summary_create_time "
+        "ON conversation_summary(create_time, conversation_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_conversation_summary_message_count "
+        "ON conversation_summary(message_count DESC, conversation_id DESC)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_conversation_summary_word_count "
+        "ON conversation_summary(word_count DESC, conversation_id DESC)"
+    )
+
+    for name, table, event, body in _triggers():
+        if name not in existing:
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} ON {table} BEGIN\n{body}\nEND")
+
+    if created:
+        conn.executescript(_refresh("1=1"))
+    conn.commit()
+    return True
+
+
+def create_conversation_summary_tables(db_path: str = "conversations.db") -> None:
+    """Create (and backfill) the conversation summary table."""
+    conn = sqlite3.connect(db_path)
+    ensure_conversation_summary(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    create_conversation_summary_tables()
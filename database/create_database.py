@@ -36,6 +36,16 @@ def create_database(db_path='conversations.db'):
         ON conversations(create_time)
     ''')
     
+    # Indexes in conversation-list sort order (keyset pagination walks them)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_update_time_id 
+        ON conversations(update_time DESC, conversation_id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_create_time_id 
+        ON conversations(create_time, conversation_id)
+    ''')
+    
     # Table: messages - individual messages within conversations
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS messages (
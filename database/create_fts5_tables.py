@@ -11,6 +11,13 @@ import sqlite3
 from pathlib import Path
 
 
+# Tokenizer of `messages_words_fts`, the analytics-only word index: keeps
+# diacritics, apostrophes (plain and smart) and underscores inside terms, so
+# its `fts5vocab` counts match analytics.extract_words(). Search keeps the
+# default tokenizer on `messages_fts`.
+WORDS_FTS_TOKENIZE = "unicode61 remove_diacritics 0 tokenchars '''_’‘'"
+
+
 def create_fts5_tables(db_path='conversations.db'):
     """Create FTS5 virtual tables for full-text search."""
     
@@ -30,6 +37,15 @@ def create_fts5_tables(db_path='conversations.db'):
         )
     ''')
     
+    # Contentless FTS5 table for word analytics (index only, no copy of the text)
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_words_fts USING fts5(
+            content,
+            content='',
+            tokenize="{WORDS_FTS_TOKENIZE}"
+        )
+    ''')
+    
     # FTS5 table for conversations (title search)
     cursor.execute('''
         CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
@@ -52,6 +68,9 @@ def create_fts5_tables(db_path='conversations.db'):
     cursor.execute("DROP TRIGGER IF EXISTS messages_fts_insert")
     cursor.execute("DROP TRIGGER IF EXISTS messages_fts_delete")
     cursor.execute("DROP TRIGGER IF EXISTS messages_fts_update")
+    cursor.execute("DROP TRIGGER IF EXISTS messages_words_fts_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS messages_words_fts_delete")
+    cursor.execute("DROP TRIGGER IF EXISTS messages_words_fts_update")
     cursor.execute("DROP TRIGGER IF EXISTS conversations_fts_insert")
     cursor.execute("DROP TRIGGER IF EXISTS conversations_fts_delete")
     cursor.execute("DROP TRIGGER IF EXISTS conversations_fts_update")
@@ -80,6 +99,28 @@ def create_fts5_tables(db_path='conversations.db'):
         END
     ''')
 
+    # Contentless tables need the old values to delete a row's terms.
+    cursor.execute('''
+        CREATE TRIGGER messages_words_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_words_fts(rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER messages_words_fts_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_words_fts(messages_words_fts, rowid, content)
+            VALUES ('delete', old.id, old.content);
+        END
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER messages_words_fts_update AFTER UPDATE OF content ON messages BEGIN
+            INSERT INTO messages_words_fts(messages_words_fts, rowid, content)
+            VALUES ('delete', old.id, old.content);
+            INSERT INTO messages_words_fts(rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+
     cursor.execute('''
         CREATE TRIGGER conversations_fts_insert AFTER INSERT ON conversations BEGIN
             INSERT INTO conversations_fts(rowid, conversation_id, title, create_time)
@@ -106,6 +147,9 @@ def create_fts5_tables(db_path='conversations.db'):
     # Rebuild indexes from their external content tables (clears orphan rowids / stale tokens)
     cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild')")
     cursor.execute("INSERT INTO conversations_fts(conversations_fts) VALUES('rebuild')")
+    # A contentless table can't 'rebuild' from `messages`: clear and re-add every row.
+    cursor.execute("INSERT INTO messages_words_fts(messages_words_fts) VALUES('delete-all')")
+    cursor.execute("INSERT INTO messages_words_fts(rowid, content) SELECT id, content FROM messages")
     
     conn.commit()
     conn.close()
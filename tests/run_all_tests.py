@@ -17,6 +17,8 @@ test_files = [
     'test_import_report.py',
     'test_integrity_checks.py',
     'test_vectordb_api.py',
+    'test_analytics.py',
+    'test_conversation_summary.py',
 ]
 
 def run_test(test_file):
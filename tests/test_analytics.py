@@ -0,0 +1,345 @@
+"""
+Tests for analytics.
+"""
+import sys
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "database"))
+
+import sqlite3
+import os
+import tempfile
+from array import array
+import analytics
+from create_database import create_database
+from create_fts5_tables import create_fts5_tables
+
+
+MESSAGES = [
+    ("conv-1", "msg-1", "user", "Python decorators explained. Don't panic about decorators.", 1700000000.0),
+    ("conv-1", "msg-2", "assistant", "Python decorators wrap functions; decorators are functions too.", 1700000060.0),
+    ("conv-2", "msg-3", "user", "Rust lifetimes versus Python decorators", 1700090000.0),
+]
+
+
+def _make_db(with_fts=True):
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        db_path = f.name
+    create_database(db_path)
+    if with_fts:
+        create_fts5_tables(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO conversations (conversation_id, title) VALUES (?, ?)",
+        [("conv-1", "Decorators"), ("conv-2", "Rust")],
+    )
+    conn.executemany(
+        "INSERT INTO messages (conversation_id, message_id, role, content, create_time) VALUES (?, ?, ?, ?, ?)",
+        MESSAGES,
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_top_words_fts5_matches_scan():
+    """The FTS5 vocabulary path and the Python scan agree on counts."""
+    fts_db = _make_db(with_fts=True)
+    scan_db = _make_db(with_fts=False)
+    try:
+        fts = {r['word']: r['count'] for r in analytics.top_words(fts_db, limit=10)}
+        scan = {r['word']: r['count'] for r in analytics.top_words(scan_db, limit=10)}
+
+        assert fts['decorators'] == scan['decorators'] == 5
+        assert fts['python'] == scan['python'] == 3
+        # Contractions are kept whole, so their stems never leak in.
+        assert 'don' not in fts
+        assert "don't" not in scan
+    finally:
+        analytics.close_connections()
+        os.unlink(fts_db)
+        os.unlink(scan_db)
+
+
+def test_top_words_fts5_tokenizes_like_scan():
+    """Every word count agrees, including accents, underscores and apostrophes."""
+    texts = [
+        "Café naïve résumé cafe CAFE",
+        "foo_bar snake_case_name variable_x plain",
+        "Don’t panic, it’s fine; rock'n'roll 'quoted' words' o'neil's",
+        "abc1 1abc version2 mixed123words années",
+        "Ünïcödé straße strasse ΑΘΗΝΑ athens",
+    ]
+    fts_db = _make_db(with_fts=True)
+    scan_db = _make_db(with_fts=False)
+    try:
+        for db_path in (fts_db, scan_db):
+            conn = sqlite3.connect(db_path)
+            conn.executemany(
+                "INSERT INTO messages (conversation_id, message_id, role, content, create_time) VALUES (?, ?, ?, ?, ?)",
+                [("conv-2", f"extra-{i}", "user", text, 1700090100.0 + i) for i, text in enumerate(texts)],
+            )
+            conn.commit()
+            conn.close()
+
+        assert analytics._top_words_fts5(analytics._connect(fts_db), 1000, 3) is not None
+        fts = analytics.top_words(fts_db, limit=1000)
+        scan = analytics.top_words(scan_db, limit=1000)
+        assert fts == scan
+
+        # The search index keeps its own tokenizer (diacritic-folding, splits on ').
+        conn = sqlite3.connect(fts_db)
+        for term in ('cafe', 'neil'):
+            hits = conn.execute(
+                "SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH ?", (term,)
+            ).fetchone()[0]
+            assert hits == 1, term
+        conn.close()
+    finally:
+        analytics.close_connections()
+        os.unlink(fts_db)
+        os.unlink(scan_db)
+
+
+def test_top_phrases_materialized_and_refreshed():
+    """Phrase counts are stored once and rebuilt when messages change."""
+    db_path = _make_db()
+    try:
+        phrases = {r['phrase']: r['count'] for r in analytics.top_phrases(db_path, limit=10)}
+        assert phrases['python decorators'] == 3
+
+        conn = sqlite3.connect(db_path)
+        stored = conn.execute(
+            "SELECT count FROM word_ngrams WHERE phrase_length = 2 AND phrase = 'python decorators'"
+        ).fetchone()
+        assert stored[0] == 3
+
+        conn.execute(
+            "INSERT INTO messages (conversation_id, message_id, role, content, create_time) VALUES (?, ?, ?, ?, ?)",
+            ("conv-2", "msg-4", "user", "python decorators again", 1700090100.0),
+        )
+        conn.commit()
+        conn.close()
+
+        phrases = {r['phrase']: r['count'] for r in analytics.top_phrases(db_path, limit=10)}
+        assert phrases['python decorators'] == 4
+
+        # Edits and a delete+insert keep the row count and max id unchanged.
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE messages SET content = 'rust lifetimes again' WHERE message_id = 'msg-4'")
+        conn.commit()
+        phrases = {r['phrase']: r['count'] for r in analytics.top_phrases(db_path, limit=10)}
+        assert phrases['python decorators'] == 3
+
+        conn.execute("DELETE FROM messages WHERE message_id = 'msg-4'")
+        conn.execute(
+            "INSERT INTO messages (conversation_id, message_id, role, content, create_time) VALUES (?, ?, ?, ?, ?)",
+            ("conv-2", "msg-5", "user", "python decorators again", 1700090100.0),
+        )
+        conn.commit()
+        conn.close()
+        phrases = {r['phrase']: r['count'] for r in analytics.top_phrases(db_path, limit=10)}
+        assert phrases['python decorators'] == 4
+    finally:
+        analytics.close_connections(db_path)
+        os.unlink(db_path)
+
+
+def test_ascii_word_spans_matches_regex():
+    """The byte-level tokenizer kernel emits the same tokens as the regex."""
+    import re
+    samples = [
+        "don't stop", "it's2 fine", "don'tx_ ok", "abc1 1abc foo_bar", "rock'n'roll",
+        "end'", "'quoted' words", "a b cc ddd", "", "x'y", "hello, world! o'neil's",
+    ]
+    for text in samples:
+        buf = text.encode("ascii")
+        starts = array('q', bytes(8 * (len(buf) // 2 + 1)))
+        ends = array('q', bytes(8 * (len(buf) // 2 + 1)))
+        count = analytics._ascii_word_spans(buf, starts, ends)
+        tokens = [text[s:e] for s, e in zip(starts[:count], ends[:count])]
+        assert tokens == re.findall(r"\b[a-z]+(?:'[a-z]+)?\b", text), text
+
+        count = analytics._ascii_word_spans(buf, starts, ends, 3)
+        long_tokens = [text[s:e] for s, e in zip(starts[:count], ends[:count])]
+        assert long_tokens == [t for t in tokens if len(t) >= 3], text
+
+
+def test_content_word_re_matches_set_filter():
+    """Rejecting stopwords inside the regex keeps the tokens of findall + set filter."""
+    import re
+    stopwords = frozenset({"the", "them", "don't", "aba", "ab'b"})
+    pattern = analytics._content_word_re(stopwords)
+    samples = [
+        "the theme of them", "don't doesn't", "ab'b'ba aba'a abab", "the1 _the the_",
+        "them's their", "",
+    ]
+    for text in samples:
+        expected = [w for w in re.findall(r"\b[a-z]+(?:'[a-z]+)?\b", text) if w not in stopwords]
+        assert [w for w in pattern.findall(text) if w] == expected, text
+
+
+def test_top_k_orders_like_sql():
+    """Top-K selection sorts by count, then alphabetically on ties."""
+    counts = {"beta": 2, "alpha": 2, "gamma": 5, "delta": 1}
+    assert analytics._top_k(counts, 3) == [("gamma", 5), ("alpha", 2), ("beta", 2)]
+    assert analytics._top_k(counts, 10) == [("gamma", 5), ("alpha", 2), ("beta", 2), ("delta", 1)]
+
+
+def test_longest_streak():
+    """Consecutive UTC days are counted as one streak."""
+    db_path = _make_db()
+    try:
+        result = analytics.longest_streak(db_path)
+        assert result == {'longest_streak': 2, 'start_date': '2023-11-14', 'end_date': '2023-11-15'}
+    finally:
+        analytics.close_connections(db_path)
+        os.unlink(db_path)
+
+
+def test_usage_over_time_daily_rollup():
+    """Unbounded usage reads the daily table and matches a range query over messages."""
+    from datetime import datetime
+    db_path = _make_db()
+    try:
+        monthly = analytics.usage_over_time(db_path, period='month')
+        ranged = analytics.usage_over_time(
+            db_path, period='month', start_date=datetime(2000, 1, 1), end_date=datetime(2100, 1, 1)
+        )
+        assert monthly == ranged
+        assert sum(r['message_count'] for r in monthly) == 3
+        assert sum(r['conversation_count'] for r in monthly) == 2
+
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "INSERT INTO messages (conversation_id, message_id, role, content, create_time) VALUES (?, ?, ?, ?, ?)",
+            ("conv-2", "msg-4", "user", "one two three", 1700090100.0),
+        )
+        conn.commit()
+        conn.close()
+
+        daily = analytics.usage_over_time(db_path, period='day')
+        assert sum(r['message_count'] for r in daily) == 4
+        assert sum(r['word_count'] for r in daily) == 23
+    finally:
+        analytics.close_connections(db_path)
+        os.unlink(db_path)
+
+
+def test_vocabulary_size_trend():
+    """Distinct words per period match a plain set over the same tokens."""
+    db_path = _make_db()
+    try:
+        trend = analytics.vocabulary_size_trend(db_path, period='month')
+        expected = set()
+        for message in MESSAGES:
+            expected.update(analytics._content_words(message[3], analytics._STOPWORDS_FROZEN))
+        assert trend == [{'period': '2023-11', 'unique_words': len(expected)}]
+    finally:
+        analytics.close_connections(db_path)
+        os.unlink(db_path)
+
+
+def test_analytics_cache_ttl_and_invalidation():
+    """Cached results expire after max_age and are dropped by invalidate_cache()."""
+    from backend.analytics_cache import get_cached, set_cached, invalidate_cache
+    db_path = _make_db()
+    try:
+        conn = sqlite3.connect(db_path)
+        set_cached(conn, "streaks", {"longest_streak": 2})
+        conn.commit()
+        assert get_cached(conn, "streaks") == {"longest_streak": 2}
+
+        conn.execute("UPDATE analytics_cache SET updated_at = updated_at - 120")
+        conn.commit()
+        assert get_cached(conn, "streaks", max_age=60) is None
+        assert get_cached(conn, "streaks", max_age=None) == {"longest_streak": 2}
+        conn.close()
+
+        invalidate_cache(db_path)
+        conn = sqlite3.connect(db_path)
+        assert get_cached(conn, "streaks", max_age=None) is None
+        conn.close()
+    finally:
+        os.unlink(db_path)
+
+
+def test_analytics_cache_memory_tier():
+    """Repeat reads reuse the decoded value until the row changes underneath."""
+    from backend.analytics_cache import get_cached, set_cached
+    db_path = _make_db()
+    try:
+        conn = sqlite3.connect(db_path)
+        set_cached(conn, "heatmap", [{"hour": 1}])
+        conn.commit()
+        first = get_cached(conn, "heatmap")
+        assert get_cached(conn, "heatmap") is first
+
+        other = sqlite3.connect(db_path)
+        set_cached(other, "heatmap", [{"hour": 2}])
+        other.execute("UPDATE analytics_cache SET value_json = '[{\"hour\": 3}]', updated_at = updated_at + 1")
+        other.commit()
+        other.close()
+        assert get_cached(conn, "heatmap") == [{"hour": 3}]
+        conn.close()
+    finally:
+        os.unlink(db_path)
+
+
+def test_analytics_cache_memory_tier_per_database():
+    """Two databases never serve each other's in-memory entries, even with equal timestamps."""
+    from unittest.mock import patch
+    from backend.analytics_cache import get_cached, set_cached, clear_cache
+    first_db, second_db = _make_db(), _make_db()
+    try:
+        first, second = sqlite3.connect(first_db), sqlite3.connect(second_db)
+        with patch("backend.analytics_cache.time.time", return_value=1700000000.0):
+            set_cached(first, "streaks", {"longest_streak": 1})
+            set_cached(second, "streaks", {"longest_streak": 2})
+            assert get_cached(first, "streaks") == {"longest_streak": 1}
+            assert get_cached(second, "streaks") == {"longest_streak": 2}
+
+            clear_cache(first)
+            assert get_cached(first, "streaks") is None
+            assert get_cached(second, "streaks") == {"longest_streak": 2}
+        first.close()
+        second.close()
+    finally:
+        os.unlink(first_db)
+        os.unlink(second_db)
+
+
+def test_precompute_analytics_fills_cache():
+    """One precompute pass caches every default dashboard result."""
+    from backend.analytics_cache import get_cached, precompute_analytics
+    db_path = _make_db()
+    try:
+        precompute_analytics(db_path)
+        conn = sqlite3.connect(db_path)
+        keys = {row[0] for row in conn.execute("SELECT cache_key FROM analytics_cache")}
+        assert {"usage:day", "usage:week", "usage:month", "streaks", "top_words_v3:50",
+                "top_phrases:30", "vocabulary:month", "response_ratio", "heatmap"} <= keys
+        assert get_cached(conn, "streaks") == analytics.longest_streak(db_path)
+        conn.close()
+    finally:
+        analytics.close_connections(db_path)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    test_top_words_fts5_matches_scan()
+    test_top_words_fts5_tokenizes_like_scan()
+    test_top_phrases_materialized_and_refreshed()
+    test_ascii_word_spans_matches_regex()
+    test_content_word_re_matches_set_filter()
+    test_top_k_orders_like_sql()
+    test_longest_streak()
+    test_usage_over_time_daily_rollup()
+    test_vocabulary_size_trend()
+    test_analytics_cache_ttl_and_invalidation()
+    test_analytics_cache_memory_tier()
+    test_analytics_cache_memory_tier_per_database()
+    test_precompute_analytics_fills_cache()
+    print("\nAll analytics tests passed!")
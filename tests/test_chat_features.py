@@ -18,6 +18,7 @@ class TestQueryImprovement(unittest.TestCase):
     def setUp(self):
         """Set up test environment."""
         if 'backend.chat.query_improver' in sys.modules:
+            sys.modules['backend.chat.query_improver'].clear_query_cache()
             del sys.modules['backend.chat.query_improver']
     
     def test_improve_query_basic(self):
@@ -59,6 +60,33 @@ class TestQueryImprovement(unittest.TestCase):
             result = improve_query_for_search(original, "openai/gpt-4o")
             
             self.assertEqual(result, original)
+    
+    def test_improve_query_cached(self):
+        """Repeated queries reuse the LLM answer; failed calls are not cached."""
+        with patch('backend.chat.query_improver.call_llm', side_effect=["", "spacetime", "other"]) as llm:
+            from backend.chat.query_improver import improve_query_for_search
+            
+            query = "What is spacetime?"
+            self.assertEqual(improve_query_for_search(query, "openai/gpt-4o"), query)
+            self.assertEqual(improve_query_for_search(query, "openai/gpt-4o"), "spacetime")
+            self.assertEqual(improve_query_for_search(query, "openai/gpt-4o"), "spacetime")
+            self.assertEqual(llm.call_count, 2)
+    
+    def test_improve_query_cache_expires_and_clears(self):
+        """Cached improvements expire after the TTL and on clear_query_cache()."""
+        with patch('backend.chat.query_improver.call_llm', side_effect=["one", "two", "three"]) as llm:
+            from backend.chat import query_improver
+            
+            query = "What is spacetime?"
+            with patch('backend.chat.query_improver.time.monotonic', return_value=0.0):
+                self.assertEqual(query_improver.improve_query_for_search(query, "openai/gpt-4o"), "one")
+                self.assertEqual(query_improver.improve_query_for_search(query, "openai/gpt-4o"), "one")
+            with patch('backend.chat.query_improver.time.monotonic',
+                       return_value=float(query_improver.QUERY_CACHE_TTL_SECONDS)):
+                self.assertEqual(query_improver.improve_query_for_search(query, "openai/gpt-4o"), "two")
+                query_improver.clear_query_cache()
+                self.assertEqual(query_improver.improve_query_for_search(query, "openai/gpt-4o"), "three")
+            self.assertEqual(llm.call_count, 3)
 
 
 class TestContextFiltering(unittest.TestCase):
@@ -82,6 +110,26 @@ class TestContextFiltering(unittest.TestCase):
         # Should be sorted by similarity (descending)
         self.assertGreaterEqual(filtered[0]["similarity"], filtered[-1]["similarity"])
     
+    def test_filter_results_large_matches_small_path(self):
+        """The vectorized path for large candidate lists picks the same results."""
+        import random
+        from backend.chat.context_manager import filter_results_by_quality
+        
+        rng = random.Random(0)
+        results = [
+            {"similarity": round(rng.random(), 1), "content": f"chunk {i}"}
+            for i in range(200)
+        ]
+        results.append({"content": "no score"})
+        
+        for max_results in (0, 1, 5, 50, 500):
+            expected = sorted(
+                (r for r in results if r.get("similarity", 0) >= 0.5),
+                key=lambda r: r.get("similarity", 0),
+                reverse=True,
+            )[:max_results]
+            self.assertEqual(filter_results_by_quality(results, 0.5, max_results), expected)
+    
     def test_format_context_for_llm(self):
         """Test context formatting for LLM."""
         from backend.chat.context_manager import format_context_for_llm
@@ -100,6 +148,17 @@ class TestContextFiltering(unittest.TestCase):
         self.assertIn("Physics Discussion", context)
         self.assertIn("0.80", context)  # Similarity score
     
+    def test_format_context_truncates_before_combining_marks(self):
+        """Truncation never separates a base character from its combining mark."""
+        from backend.chat.context_manager import format_context_for_llm
+        
+        content = "a" * 196 + "e\u0301" * 20
+        context = format_context_for_llm([{"similarity": 0.9, "content": content}], max_chunk_chars=200)
+        
+        body = context.split("\n", 2)[2]
+        self.assertTrue(body.endswith("...\n\n"))
+        self.assertEqual(body[:-5], "a" * 196)
+    
     def test_format_context_empty(self):
         """Test formatting empty results."""
         from backend.chat.context_manager import format_context_for_llm
@@ -130,6 +189,78 @@ class TestHistoryManagement(unittest.TestCase):
         # Should include recent messages
         self.assertGreater(len(windowed), 1)
     
+    def test_apply_sliding_window_bpe_estimator(self):
+        """The cached BPE counter works as a token_estimator."""
+        from backend.chat.history_manager import apply_sliding_window, bpe_token_count
+        
+        messages = [{"role": "user", "content": f"Message {i} " * 50} for i in range(10)]
+        with patch("backend.chat.history_manager.start_bpe_encoding_load"):
+            windowed = apply_sliding_window(messages, max_tokens=300, token_estimator=bpe_token_count)
+            self.assertLessEqual(sum(bpe_token_count(m["content"]) for m in windowed), 300)
+        
+        self.assertLess(len(windowed), len(messages))
+        self.assertIs(windowed[-1], messages[-1])
+    
+    def test_bpe_token_count_tiktoken(self):
+        """With tiktoken, counts are exact BPE lengths and cached by digest, not text."""
+        from backend.chat import history_manager
+        
+        encoding = history_manager.load_bpe_encoding()
+        if encoding is None:
+            self.skipTest("tiktoken (cl100k_base) not available")
+        
+        text = "Tell me more about spacetime and quantum mechanics. " * 20
+        expected = len(encoding.encode(text))
+        self.assertEqual(history_manager.bpe_token_count(text), expected)
+        self.assertNotIn(text, history_manager._bpe_counts)
+        with patch.object(encoding, "encode", side_effect=AssertionError("not cached")):
+            self.assertEqual(history_manager.bpe_token_count(text), expected)
+    
+    def test_bpe_window_differs_from_char_estimate(self):
+        """Once the encoding is loaded the window is sized in BPE tokens, not chars / 4."""
+        from collections import OrderedDict
+        from backend.chat import history_manager
+        
+        one_token_per_char = MagicMock()
+        one_token_per_char.encode.side_effect = lambda text, **kwargs: list(text)
+        messages = [{"role": "user", "content": "x" * 100} for _ in range(10)]
+        
+        with patch.object(history_manager, "_bpe_counts", OrderedDict()):
+            with patch.object(history_manager, "_bpe_encoding_value", None), \
+                    patch.object(history_manager, "start_bpe_encoding_load"):
+                # Not loaded yet: same window as the default estimator (25 tokens each).
+                windowed = history_manager.apply_sliding_window(
+                    messages, max_tokens=300, token_estimator=history_manager.bpe_token_count
+                )
+                self.assertEqual(windowed, history_manager.apply_sliding_window(messages, max_tokens=300))
+                self.assertEqual(len(windowed), 10)
+            with patch.object(history_manager, "_bpe_encoding_value", one_token_per_char):
+                windowed = history_manager.apply_sliding_window(
+                    messages, max_tokens=300, token_estimator=history_manager.bpe_token_count
+                )
+                self.assertEqual(len(windowed), 3)
+    
+    def test_bpe_encoding_failed_load_is_retried(self):
+        """A failed load falls back to estimate_tokens, and is retried after the backoff."""
+        from backend.chat import history_manager
+        
+        fake_encoding = MagicMock()
+        fake_tiktoken = MagicMock()
+        fake_tiktoken.get_encoding.return_value = fake_encoding
+        with patch.object(history_manager, "_bpe_encoding_value", None), \
+                patch.object(history_manager, "_bpe_failed_at", None), \
+                patch.object(history_manager, "_bpe_loading", False):
+            with patch.dict(sys.modules, {"tiktoken": None}):
+                self.assertIsNone(history_manager.load_bpe_encoding())
+            failed_at = history_manager._bpe_failed_at
+            self.assertIsNotNone(failed_at)
+            with patch.dict(sys.modules, {"tiktoken": fake_tiktoken}):
+                # Within the backoff: not retried.
+                self.assertIsNone(history_manager.load_bpe_encoding())
+                history_manager._bpe_failed_at = failed_at - history_manager._BPE_RETRY_SECONDS
+                self.assertIs(history_manager.load_bpe_encoding(), fake_encoding)
+            self.assertIsNone(history_manager._bpe_failed_at)
+    
     def test_apply_sliding_window_truncates(self):
         """Test that sliding window truncates old messages."""
         from backend.chat.history_manager import apply_sliding_window
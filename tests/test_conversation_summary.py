@@ -0,0 +1,93 @@
+"""
+Tests for the trigger-maintained conversation_summary table.
+"""
+import sys
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "database"))
+
+import sqlite3
+import json
+import os
+import tempfile
+from create_database import create_database
+from create_organization_tables import create_organization_tables
+from create_metadata_calc_tables import create_metadata_calc_tables
+from create_conversation_summary_tables import create_conversation_summary_tables
+
+
+def _make_db():
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+        db_path = f.name
+    create_database(db_path)
+    create_organization_tables(db_path)
+    create_metadata_calc_tables(db_path)
+    return db_path
+
+
+def _summary(conn):
+    return {
+        row[0]: row[1:]
+        for row in conn.execute('''
+            SELECT conversation_id, title, is_starred, message_count, word_count, custom_title, tags_json
+            FROM conversation_summary
+        ''')
+    }
+
+
+def test_backfill_existing_conversations():
+    """Conversations imported before the table existed are backfilled."""
+    db_path = _make_db()
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO conversations (conversation_id, title) VALUES ('conv-1', 'First')")
+        conn.commit()
+
+        create_conversation_summary_tables(db_path)
+        assert _summary(conn) == {'conv-1': ('First', 0, 0, 0, None, '[]')}
+        conn.close()
+    finally:
+        os.unlink(db_path)
+
+
+def test_triggers_keep_summary_current():
+    """Writes to any source table are reflected in the summary row."""
+    db_path = _make_db()
+    try:
+        create_conversation_summary_tables(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO conversations (conversation_id, title) VALUES ('conv-1', 'First')")
+        conn.execute("INSERT INTO conversations (conversation_id, title) VALUES ('conv-2', 'Second')")
+        conn.execute("INSERT INTO tags (name) VALUES ('python'), ('rust')")
+        # OR IGNORE on the outer statement must not turn the refresh into a no-op.
+        conn.execute("INSERT OR IGNORE INTO conversation_tags (conversation_id, tag_id) VALUES ('conv-1', 1)")
+        conn.execute("INSERT OR IGNORE INTO conversation_tags (conversation_id, tag_id) VALUES ('conv-1', 2)")
+        conn.execute('''
+            INSERT OR REPLACE INTO conversation_stats (conversation_id, message_count_total, word_count_total)
+            VALUES ('conv-1', 4, 120)
+        ''')
+        conn.execute("INSERT OR REPLACE INTO custom_titles (conversation_id, custom_title) VALUES ('conv-2', 'Renamed')")
+        conn.execute("UPDATE conversations SET is_starred = 1 WHERE conversation_id = 'conv-2'")
+        conn.execute("UPDATE tags SET name = 'rustlang' WHERE tag_id = 2")
+        conn.commit()
+
+        summary = _summary(conn)
+        assert summary['conv-1'][:5] == ('First', 0, 4, 120, None)
+        assert sorted(json.loads(summary['conv-1'][5])) == ['python', 'rustlang']
+        assert summary['conv-2'] == ('Second', 1, 0, 0, 'Renamed', '[]')
+
+        conn.execute("DELETE FROM tags WHERE tag_id = 1")
+        conn.execute("DELETE FROM custom_titles WHERE conversation_id = 'conv-2'")
+        conn.execute("DELETE FROM conversations WHERE conversation_id = 'conv-1'")
+        conn.commit()
+        assert _summary(conn) == {'conv-2': ('Second', 1, 0, 0, None, '[]')}
+        conn.close()
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    test_backfill_existing_conversations()
+    test_triggers_keep_summary_current()
+    print("\nAll conversation summary tests passed!")